@@ -1,6 +1,7 @@
 import os
 import io
 import json
+import time
 import asyncio
 import base64
 from typing import Optional
@@ -8,6 +9,7 @@ from urllib.parse import quote_plus
 
 from fastapi import FastAPI, Request, Response, HTTPException, status, BackgroundTasks
 from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
 import httpx
 
 app = FastAPI()
@@ -22,6 +24,10 @@ SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
 SERVER_PORT = int(os.environ.get("SERVER_PORT", 8000))
 STREAM_CHANNEL = os.environ.get("CAMERA_STREAM_CHANNEL", "101")  # default main stream
 PTZ_TIMEOUT = int(os.environ.get("PTZ_TIMEOUT", 5))  # seconds for PTZ request timeout
+# When set, /stream proxies the camera's native MJPEG-over-HTTP endpoint
+# (e.g. ISAPI/Streaming/channels/102/httpPreview with the substream set to
+# MJPEG) with no transcode at all.
+MJPEG_PATH = os.environ.get("CAMERA_MJPEG_PATH", "")
 
 def get_rtsp_url():
     user_enc = quote_plus(CAMERA_USER)
@@ -50,27 +56,168 @@ async def update_camera_config(config_data: dict):
         resp.raise_for_status()
         return resp.text
 
-async def fetch_snapshot():
+async def open_snapshot_stream():
+    """Open the snapshot request in streaming mode.
+
+    Returns (client, response); the caller must close both. Streaming keeps
+    multi-megabyte snapshots from being buffered whole in driver memory.
+    """
     url = f"{get_camera_base_http()}/ISAPI/Streaming/channels/{STREAM_CHANNEL}/picture"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=get_auth_header(), timeout=5)
+    client = httpx.AsyncClient()
+    try:
+        req = client.build_request("GET", url, headers=get_auth_header(), timeout=5)
+        resp = await client.send(req, stream=True)
         resp.raise_for_status()
-        return resp.content, resp.headers.get("Content-Type", "image/jpeg")
+    except Exception:
+        await client.aclose()
+        raise
+    return client, resp
+
+# Shared keep-alive client for PTZ; joystick clients spray dozens of POSTs
+# per second and a per-call AsyncClient pays a TCP handshake for each.
+PTZ_CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=4),
+    timeout=PTZ_TIMEOUT,
+)
 
 async def send_ptz_command(ptz_payload: dict):
     url = f"{get_camera_base_http()}/ISAPI/PTZCtrl/channels/{STREAM_CHANNEL}/continuous"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, data=json.dumps(ptz_payload), headers={**get_auth_header(), "Content-Type": "application/json"}, timeout=PTZ_TIMEOUT)
-        resp.raise_for_status()
-        return resp.text
+    resp = await PTZ_CLIENT.post(url, data=json.dumps(ptz_payload), headers={**get_auth_header(), "Content-Type": "application/json"})
+    resp.raise_for_status()
+    return resp.text
+
+# Debounce window: commands that arrive while a flush is pending are latched
+# (latest wins) and share one camera round-trip — continuous-move PTZ only
+# cares about the most recent velocity anyway.
+PTZ_DEBOUNCE_S = float(os.environ.get("PTZ_DEBOUNCE_MS", "50")) / 1000.0
+_ptz_state = {"payload": None, "task": None, "future": None}
+
+async def _flush_ptz():
+    await asyncio.sleep(PTZ_DEBOUNCE_S)
+    while True:
+        payload = _ptz_state["payload"]
+        future = _ptz_state["future"]
+        # Swap in a fresh future before the POST: commands latched while the
+        # request is in flight coalesce onto it and are sent (and resolved)
+        # by the next loop iteration instead of being silently dropped —
+        # crucially the terminal "stop" of a joystick burst.
+        _ptz_state["future"] = asyncio.get_running_loop().create_future()
+        try:
+            result = await send_ptz_command(payload)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        # Identity check: each submission latches a distinct dict, so this
+        # only exits once the payload we just sent is still the latest.
+        if _ptz_state["payload"] is payload:
+            return
+
+async def submit_ptz_command(ptz_payload: dict):
+    _ptz_state["payload"] = ptz_payload
+    if _ptz_state["task"] is None or _ptz_state["task"].done():
+        _ptz_state["future"] = asyncio.get_running_loop().create_future()
+        _ptz_state["task"] = asyncio.create_task(_flush_ptz())
+    # While a flush task is running, _ptz_state["future"] is always the
+    # future its next camera round-trip will resolve, so awaiting it is
+    # correct in both the debounce and in-flight phases.
+    return await asyncio.shield(_ptz_state["future"])
+
+@app.on_event("shutdown")
+async def close_ptz_client():
+    await PTZ_CLIENT.aclose()
 
 # --- Video Stream Proxy ---
-# Use OpenCV for RTSP -> MJPEG conversion, as many browsers support MJPEG-over-HTTP.
+# Proxy RTSP -> MJPEG through a single ffmpeg subprocess, as many browsers
+# support MJPEG-over-HTTP. ffmpeg's -f mpjpeg muxer emits the multipart
+# boundary framing itself (boundary "ffmpeg"), so the generator only forwards
+# raw stdout bytes; decode and JPEG encode happen natively inside ffmpeg
+# instead of per-frame in Python. -fflags nobuffer keeps first-frame latency
+# in the tens of milliseconds. OpenCV is kept as a fallback when no ffmpeg
+# binary is available.
+import shutil
+import subprocess
+
+FFMPEG_BIN = os.environ.get("FFMPEG_BIN", "ffmpeg")
+# HW_ACCEL=vaapi|cuda offloads the H.264 decode (and, for VAAPI, the JPEG
+# encode too) to the GPU instead of burning CPU per stream client.
+HW_ACCEL = os.environ.get("HW_ACCEL", "").lower()
+
+def ffmpeg_mjpeg_args(rtsp_url):
+    args = [
+        FFMPEG_BIN,
+        "-rtsp_transport", "tcp",
+        "-fflags", "nobuffer",
+        "-flags", "low_delay",
+    ]
+    if HW_ACCEL == "vaapi":
+        args += ["-hwaccel", "vaapi", "-hwaccel_output_format", "vaapi"]
+        args += ["-i", rtsp_url]
+        args += ["-vf", "format=nv12|vaapi,hwupload", "-c:v", "mjpeg_vaapi"]
+    elif HW_ACCEL == "cuda":
+        args += ["-hwaccel", "cuda", "-c:v", "h264_cuvid"]
+        args += ["-i", rtsp_url]
+        args += ["-c:v", "mjpeg"]
+    else:
+        args += ["-i", rtsp_url]
+        args += ["-c:v", "mjpeg"]
+    args += [
+        "-q:v", "5",
+        "-f", "mpjpeg",
+        "-loglevel", "error",
+        "-",
+    ]
+    return args
+
+def ffmpeg_mjpeg_generator(rtsp_url):
+    proc = subprocess.Popen(
+        ffmpeg_mjpeg_args(rtsp_url),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        bufsize=0,
+    )
+    try:
+        while True:
+            chunk = proc.stdout.read(65536)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        proc.stdout.close()
+        proc.terminate()
+        proc.wait()
+
+# Shrink OpenCV's FFmpeg demuxer queue before cv2 is imported.
+os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS",
+                      "rtsp_transport;tcp|max_delay;100000|fflags;nobuffer")
+
 import cv2
-from starlette.concurrency import run_in_threadpool
+
+# Prefer libjpeg-turbo (SIMD DCT/Huffman) over OpenCV's bundled encoder for
+# the fallback path; cv2.imencode is used when PyTurboJPEG is not installed.
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    TURBO_JPEG = TurboJPEG()
+except Exception:
+    TURBO_JPEG = None
+
+def encode_jpeg(frame, quality=80):
+    if TURBO_JPEG is not None:
+        return TURBO_JPEG.encode(frame, quality=quality, pixel_format=TJPF_BGR)
+    ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return jpeg.tobytes() if ok else None
+
+# Constant multipart framing, yielded as separate chunks so each frame is
+# passed through without being copied into a new len(jpeg)+50 bytes object;
+# the server concatenates at the socket layer.
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+MJPEG_PART_TRAILER = b'\r\n'
 
 def mjpeg_frame_generator(rtsp_url):
     cap = cv2.VideoCapture(rtsp_url)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
     if not cap.isOpened():
         raise RuntimeError("Could not open RTSP stream")
     try:
@@ -78,34 +225,100 @@ def mjpeg_frame_generator(rtsp_url):
             ret, frame = cap.read()
             if not ret:
                 break
-            ret, jpeg = cv2.imencode('.jpg', frame)
-            if not ret:
+            frame_bytes = encode_jpeg(frame)
+            if frame_bytes is None:
                 continue
-            yield (
-                b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n'
-            )
+            yield MJPEG_PART_HEADER
+            yield frame_bytes
+            yield MJPEG_PART_TRAILER
     finally:
         cap.release()
 
+async def open_native_mjpeg():
+    """Open the camera's own MJPEG endpoint in streaming mode.
+
+    Returns (client, response); the caller must close both.
+    """
+    url = f"{get_camera_base_http()}/{MJPEG_PATH.lstrip('/')}"
+    client = httpx.AsyncClient()
+    try:
+        req = client.build_request("GET", url, headers=get_auth_header(), timeout=None)
+        resp = await client.send(req, stream=True)
+        resp.raise_for_status()
+    except Exception:
+        await client.aclose()
+        raise
+    return client, resp
+
 @app.get("/stream", summary="Retrieves the live video stream")
 async def stream():
     rtsp_url = get_rtsp_url()
-    generator = lambda: mjpeg_frame_generator(rtsp_url)
-    return StreamingResponse(run_in_threadpool(generator), media_type="multipart/x-mixed-replace; boundary=frame")
+    if MJPEG_PATH:
+        # Camera emits MJPEG itself; pass the bytes through untouched and
+        # forward its Content-Type verbatim — the header carries the
+        # camera's multipart boundary, without which clients cannot
+        # delimit the frames.
+        try:
+            client, resp = await open_native_mjpeg()
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"MJPEG stream failed: {e}")
+
+        async def close():
+            await resp.aclose()
+            await client.aclose()
+
+        return StreamingResponse(
+            resp.aiter_bytes(),
+            media_type=resp.headers.get("Content-Type", "multipart/x-mixed-replace"),
+            background=BackgroundTask(close),
+        )
+    if shutil.which(FFMPEG_BIN) is not None:
+        return StreamingResponse(
+            ffmpeg_mjpeg_generator(rtsp_url),
+            media_type="multipart/x-mixed-replace; boundary=ffmpeg",
+        )
+    return StreamingResponse(
+        mjpeg_frame_generator(rtsp_url),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+    )
 
 @app.get("/capture", summary="Captures a current image snapshot")
 async def capture():
     try:
-        img_bytes, content_type = await fetch_snapshot()
-        return Response(content=img_bytes, media_type=content_type)
+        client, resp = await open_snapshot_stream()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Snapshot failed: {e}")
 
+    async def close():
+        await resp.aclose()
+        await client.aclose()
+
+    return StreamingResponse(
+        resp.aiter_bytes(65536),
+        media_type=resp.headers.get("Content-Type", "image/jpeg"),
+        background=BackgroundTask(close),
+    )
+
+# Short TTL cache so bursty config polling doesn't hammer the camera CGI.
+CONFIG_CACHE_TTL = float(os.environ.get("CONFIG_CACHE_TTL", "1.5"))
+_config_cache = {"ts": 0.0, "val": None}
+_config_lock = asyncio.Lock()
+
+async def fetch_camera_config_cached():
+    now = time.monotonic()
+    if _config_cache["val"] is not None and now - _config_cache["ts"] < CONFIG_CACHE_TTL:
+        return _config_cache["val"]
+    async with _config_lock:
+        now = time.monotonic()
+        if _config_cache["val"] is None or now - _config_cache["ts"] >= CONFIG_CACHE_TTL:
+            _config_cache["val"] = await fetch_camera_config()
+            _config_cache["ts"] = time.monotonic()
+    return _config_cache["val"]
+
 @app.get("/config", summary="Retrieves camera configuration and status")
 async def get_config():
     try:
-        config_text = await fetch_camera_config()
+        config_text = await fetch_camera_config_cached()
         # Try to parse as JSON to pretty-print if possible
         try:
             config_obj = json.loads(config_text)
@@ -120,6 +333,7 @@ async def put_config(request: Request):
     try:
         config_data = await request.json()
         resp = await update_camera_config(config_data)
+        _config_cache["val"] = None  # force refetch after a write
         return Response(content=resp, media_type="text/plain")
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Config update failed: {e}")
@@ -128,7 +342,7 @@ async def put_config(request: Request):
 async def ptz(request: Request):
     try:
         ptz_payload = await request.json()
-        resp = await send_ptz_command(ptz_payload)
+        resp = await submit_ptz_command(ptz_payload)
         return Response(content=resp, media_type="text/plain")
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"PTZ command failed: {e}")
@@ -1,12 +1,23 @@
+import array
+import ctypes
 import os
-import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse, parse_qs
+import struct
+import time
 import threading
 
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+
+# /read is commonly polled at high rate; orjson serializes 2-5x faster than
+# stdlib json. Fall back to the default encoder when it isn't installed.
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as JSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse
+
 try:
     from snap7.client import Client as Snap7Client
-    import snap7.util
     import snap7.types
 except ImportError:
     raise ImportError("snap7 library is required. Install with 'pip install python-snap7'.")
@@ -19,7 +30,17 @@ PLC_SLOT = int(os.environ.get('PLC_SLOT', 1))
 SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
 SERVER_PORT = int(os.environ.get('SERVER_PORT', 8080))
 
-# Snap7 connection singleton (threadsafe)
+AREA_MAP = {
+    'DB': snap7.types.Areas.DB,
+    'PE': snap7.types.Areas.PE,
+    'PA': snap7.types.Areas.PA,
+    'MK': snap7.types.Areas.MK
+}
+
+# Snap7 connection singleton (threadsafe).
+# The client stays connected across requests; instead of pinging the PLC
+# before every operation, callers run through run_op() which reconnects and
+# retries once only when an operation actually fails.
 class PLCConnection:
     _lock = threading.Lock()
     _client = None
@@ -30,10 +51,29 @@ class PLCConnection:
             if cls._client is None:
                 cls._client = Snap7Client()
                 cls._client.connect(PLC_IP, PLC_RACK, PLC_SLOT, PLC_PORT)
-            elif not cls._client.get_connected():
-                cls._client.connect(PLC_IP, PLC_RACK, PLC_SLOT, PLC_PORT)
             return cls._client
 
+    @classmethod
+    def reconnect(cls):
+        with cls._lock:
+            if cls._client is not None:
+                try:
+                    cls._client.disconnect()
+                except Exception:
+                    pass
+            cls._client = Snap7Client()
+            cls._client.connect(PLC_IP, PLC_RACK, PLC_SLOT, PLC_PORT)
+            return cls._client
+
+    @classmethod
+    def run_op(cls, op):
+        client = cls.get_client()
+        try:
+            return op(client)
+        except Exception:
+            client = cls.reconnect()
+            return op(client)
+
     @classmethod
     def close(cls):
         with cls._lock:
@@ -41,156 +81,186 @@ class PLCConnection:
                 cls._client.disconnect()
                 cls._client = None
 
-def plc_read_area(area, db_number, start, size, data_type):
-    client = PLCConnection.get_client()
-    data = client.read_area(area, db_number, start, size)
+# Prepacked converters for the S7 big-endian wire formats. snap7.util does
+# the same transforms with per-call Python slicing and int arithmetic; a
+# pre-built struct.Struct is one C call each way and no intermediate objects.
+_S7_INT = struct.Struct('>h')
+_S7_DINT = struct.Struct('>i')
+_S7_REAL = struct.Struct('>f')
+
+def decode_plc_value(data, data_type):
     if data_type == 'BOOL':
-        return snap7.util.get_bool(data, 0, 0)
+        return bool(data[0] & 0x01)
     elif data_type == 'INT':
-        return snap7.util.get_int(data, 0)
+        return _S7_INT.unpack_from(data)[0]
     elif data_type == 'DINT':
-        return snap7.util.get_dint(data, 0)
+        return _S7_DINT.unpack_from(data)[0]
     elif data_type == 'REAL':
-        return snap7.util.get_real(data, 0)
+        return _S7_REAL.unpack_from(data)[0]
     else:
         return list(data)
 
+def plc_read_area(area, db_number, start, size, data_type):
+    data = PLCConnection.run_op(lambda c: c.read_area(area, db_number, start, size))
+    return decode_plc_value(data, data_type)
+
+def plc_read_multi(items):
+    """Read many variables in one S7 PDU via read_multi_vars.
+
+    items: list of dicts with area (snap7 Areas), db, start, size, data_type.
+    Bundling N items into one request turns N LAN round-trips (~10 ms each)
+    into one.
+    """
+    data_items = (snap7.types.S7DataItem * len(items))()
+    buffers = []
+    for i, item in enumerate(items):
+        di = data_items[i]
+        di.Area = ctypes.c_int32(int(item['area']))
+        di.WordLen = ctypes.c_int32(snap7.types.S7WLByte)
+        di.DBNumber = ctypes.c_int32(item['db'])
+        di.Start = ctypes.c_int32(item['start'])
+        di.Amount = ctypes.c_int32(item['size'])
+        buf = (ctypes.c_uint8 * item['size'])()
+        buffers.append(buf)
+        di.pData = ctypes.cast(buf, ctypes.POINTER(ctypes.c_uint8))
+    PLCConnection.run_op(lambda c: c.read_multi_vars(data_items))
+    results = []
+    for item, di, buf in zip(items, data_items, buffers):
+        if di.Result != 0:
+            results.append({'success': False, 'error': f"S7 item error {di.Result}"})
+        else:
+            value = decode_plc_value(bytearray(buf), item['data_type'])
+            results.append({'success': True, 'value': value})
+    return results
+
+# Tiny TTL cache so scrapers polling the same variable many times per second
+# coalesce into one PLC round-trip.
+READ_CACHE_TTL = float(os.environ.get('READ_CACHE_TTL', '0.05'))
+_read_cache = {}
+_read_cache_lock = threading.Lock()
+
+def plc_read_area_cached(area, db_number, start, size, data_type):
+    key = (int(area), db_number, start, size, data_type)
+    now = time.monotonic()
+    with _read_cache_lock:
+        hit = _read_cache.get(key)
+        if hit is not None and now - hit[0] < READ_CACHE_TTL:
+            return hit[1]
+    value = plc_read_area(area, db_number, start, size, data_type)
+    with _read_cache_lock:
+        _read_cache[key] = (time.monotonic(), value)
+    return value
+
+# Reused one-byte buffers for BOOL writes; bool(value) indexes them
+# directly, so /ctrl does no allocation and no branch per call. snap7 only
+# reads the buffer, so sharing is safe.
+_BOOL_BUFS = (bytearray((0x00,)), bytearray((0x01,)))
+
 def plc_write_area(area, db_number, start, value, data_type):
-    client = PLCConnection.get_client()
     if data_type == 'BOOL':
-        data = bytearray(1)
-        snap7.util.set_bool(data, 0, 0, bool(value))
-        client.write_area(area, db_number, start, data)
+        data = _BOOL_BUFS[bool(value)]
     elif data_type == 'INT':
-        data = bytearray(2)
-        snap7.util.set_int(data, 0, int(value))
-        client.write_area(area, db_number, start, data)
+        data = bytearray(_S7_INT.size)
+        _S7_INT.pack_into(data, 0, int(value))
     elif data_type == 'DINT':
-        data = bytearray(4)
-        snap7.util.set_dint(data, 0, int(value))
-        client.write_area(area, db_number, start, data)
+        data = bytearray(_S7_DINT.size)
+        _S7_DINT.pack_into(data, 0, int(value))
     elif data_type == 'REAL':
-        data = bytearray(4)
-        snap7.util.set_real(data, 0, float(value))
-        client.write_area(area, db_number, start, data)
+        data = bytearray(_S7_REAL.size)
+        _S7_REAL.pack_into(data, 0, float(value))
+    elif data_type == 'RAW':
+        # array.array copies the int list into a contiguous buffer in C and
+        # range-checks 0..255 as it goes, instead of iterating in Python.
+        data = bytearray(array.array('B', value if isinstance(value, list) else (value,)))
     else:
         raise ValueError("Unsupported data_type for write")
+    PLCConnection.run_op(lambda c: c.write_area(area, db_number, start, data))
 
-class SiemensPLCHandler(BaseHTTPRequestHandler):
-    def _set_headers(self, status_code=200, content_type='application/json'):
-        self.send_response(status_code)
-        self.send_header('Content-type', content_type)
-        self.end_headers()
-
-    def do_GET(self):
-        parsed = urlparse(self.path)
-        if parsed.path == '/read':
-            params = parse_qs(parsed.query)
-            try:
-                area_str = params.get('area', ['DB'])[0]
-                db_number = int(params.get('db', [1])[0])
-                start = int(params.get('start', [0])[0])
-                size = int(params.get('size', [2])[0])
-                data_type = params.get('data_type', ['INT'])[0]
-
-                area_map = {
-                    'DB': snap7.types.Areas.DB,
-                    'PE': snap7.types.Areas.PE,
-                    'PA': snap7.types.Areas.PA,
-                    'MK': snap7.types.Areas.MK
-                }
-                area = area_map.get(area_str.upper())
-                if area is None:
-                    raise ValueError("Invalid area")
-
-                value = plc_read_area(area, db_number, start, size, data_type)
-                resp = {'success': True, 'value': value}
-                self._set_headers()
-                self.wfile.write(json.dumps(resp).encode())
-            except Exception as e:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
-        else:
-            self._set_headers(404)
-            self.wfile.write(json.dumps({'error': 'Not found'}).encode())
+# FastAPI runs these plain-def handlers in its threadpool, so the blocking
+# snap7 calls never stall the event loop; uvicorn replaces the hand-rolled
+# http.server loop and gives us keep-alive and parallel workers for free.
+app = FastAPI()
 
-    def do_POST(self):
-        parsed = urlparse(self.path)
-        length = int(self.headers.get('content-length', 0))
-        raw = self.rfile.read(length) if length > 0 else b''
-        try:
-            payload = json.loads(raw.decode()) if raw else {}
-        except Exception:
-            payload = {}
-
-        if parsed.path == '/write':
-            try:
-                area_str = payload.get('area', 'DB')
-                db_number = int(payload.get('db', 1))
-                start = int(payload.get('start', 0))
-                data_type = payload.get('data_type', 'INT')
-                value = payload['value']
-
-                area_map = {
-                    'DB': snap7.types.Areas.DB,
-                    'PE': snap7.types.Areas.PE,
-                    'PA': snap7.types.Areas.PA,
-                    'MK': snap7.types.Areas.MK
-                }
-                area = area_map.get(area_str.upper())
-                if area is None:
-                    raise ValueError("Invalid area")
-
-                plc_write_area(area, db_number, start, value, data_type)
-                self._set_headers()
-                self.wfile.write(json.dumps({'success': True}).encode())
-            except Exception as e:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
-
-        elif parsed.path == '/ctrl':
-            try:
-                # Control an output (digital or analog)
-                # Expected payload: area, db, start, data_type, value
-                area_str = payload.get('area', 'PA')
-                db_number = int(payload.get('db', 0))
-                start = int(payload.get('start', 0))
-                data_type = payload.get('data_type', 'BOOL')
-                value = payload['value']
-
-                area_map = {
-                    'DB': snap7.types.Areas.DB,
-                    'PE': snap7.types.Areas.PE,
-                    'PA': snap7.types.Areas.PA,
-                    'MK': snap7.types.Areas.MK
-                }
-                area = area_map.get(area_str.upper())
-                if area is None:
-                    raise ValueError("Invalid area")
-
-                plc_write_area(area, db_number, start, value, data_type)
-                self._set_headers()
-                self.wfile.write(json.dumps({'success': True}).encode())
-            except Exception as e:
-                self._set_headers(400)
-                self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
-        else:
-            self._set_headers(404)
-            self.wfile.write(json.dumps({'error': 'Not found'}).encode())
+@app.exception_handler(RequestValidationError)
+async def invalid_body_handler(request, exc):
+    # The hand-rolled server treated unparseable bodies as {} and answered
+    # with a 400 {'success': False, ...}; keep that contract instead of
+    # FastAPI's 422 validation payload.
+    return JSONResponse({'success': False, 'error': 'Invalid JSON body'}, status_code=400)
+
+@app.on_event("shutdown")
+def close_plc():
+    PLCConnection.close()
 
-    def log_message(self, format, *args):
-        # Silence standard logging
-        return
+@app.get('/read')
+def api_read(area: str = 'DB', db: int = 1, start: int = 0, size: int = 2, data_type: str = 'INT'):
+    try:
+        area_enum = AREA_MAP.get(area.upper())
+        if area_enum is None:
+            raise ValueError("Invalid area")
+        value = plc_read_area_cached(area_enum, db, start, size, data_type)
+        return JSONResponse({'success': True, 'value': value})
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+@app.post('/read_multi')
+def api_read_multi(payload: list):
+    try:
+        if not payload:
+            raise ValueError("Body must be a non-empty JSON list of items")
+        items = []
+        for entry in payload:
+            area = AREA_MAP.get(str(entry.get('area', 'DB')).upper())
+            if area is None:
+                raise ValueError("Invalid area")
+            items.append({
+                'area': area,
+                'db': int(entry.get('db', 1)),
+                'start': int(entry.get('start', 0)),
+                'size': int(entry.get('size', 2)),
+                'data_type': entry.get('data_type', 'INT'),
+            })
+        results = plc_read_multi(items)
+        return JSONResponse({'success': True, 'results': results})
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+_WRITE_TYPES = frozenset({'BOOL', 'INT', 'DINT', 'REAL', 'RAW'})
+
+def _write_from_payload(payload, default_area, default_db, default_type):
+    # Reject malformed bodies up front so bad requests 400 before any
+    # buffer is packed or the PLC is touched.
+    if 'value' not in payload:
+        raise ValueError("Missing 'value'")
+    area = AREA_MAP.get(str(payload.get('area', default_area)).upper())
+    if area is None:
+        raise ValueError("Invalid area")
+    data_type = payload.get('data_type', default_type)
+    if data_type not in _WRITE_TYPES:
+        raise ValueError("Unsupported data_type for write")
+    db_number = int(payload.get('db', default_db))
+    start = int(payload.get('start', 0))
+
+    plc_write_area(area, db_number, start, payload['value'], data_type)
+
+@app.post('/write')
+def api_write(payload: dict):
+    try:
+        _write_from_payload(payload, 'DB', 1, 'INT')
+        return JSONResponse({'success': True})
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
 
-def run():
-    server = HTTPServer((SERVER_HOST, SERVER_PORT), SiemensPLCHandler)
+@app.post('/ctrl')
+def api_ctrl(payload: dict):
+    # Control an output (digital or analog)
+    # Expected payload: area, db, start, data_type, value
     try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        pass
-    finally:
-        PLCConnection.close()
-        server.server_close()
+        _write_from_payload(payload, 'PA', 0, 'BOOL')
+        return JSONResponse({'success': True})
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
 
 if __name__ == '__main__':
-    run()
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT)
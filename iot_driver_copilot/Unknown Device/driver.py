@@ -1,7 +1,24 @@
+import asyncio
 import os
-import json
-import random
-from flask import Flask, jsonify, Response
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+# orjson returns bytes straight from C, skipping the stdlib encoder plus the
+# .encode() step; fall back to the stdlib encoder when not installed.
+try:
+    import orjson
+except ImportError:
+    import json
+    orjson = None
+
+def dump_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
 
 # Configuration from environment variables
 DEVICE_NAME = os.environ.get('DEVICE_NAME', 'Unknown Device')
@@ -11,36 +28,80 @@ DEVICE_TYPE = os.environ.get('DEVICE_TYPE', 'Sensor')
 HTTP_HOST = os.environ.get('HTTP_HOST', '0.0.0.0')
 HTTP_PORT = int(os.environ.get('HTTP_PORT', '8080'))
 
-app = Flask(__name__)
+DEVICE_INFO = {
+    "name": DEVICE_NAME,
+    "model": DEVICE_MODEL,
+    "manufacturer": MANUFACTURER,
+    "type": DEVICE_TYPE,
+}
+
+# One PCG64 generator plus vectorized bounds: a single batched uniform()
+# draw replaces five Mersenne Twister round-trips per refresh tick.
+rng = np.random.default_rng()
+_UNIFORM_LO = np.array([-100.0, -100.0, -180.0, 18.0, 55.0])
+_UNIFORM_HI = np.array([100.0, 100.0, 180.0, 44.0, 135.0])
 
 # Dummy function to simulate reading from the sensor device
 def read_sensor_data():
     # Data points: X, Y, Rz, 18°–44°, 55mm–135mm, 258.00mm, 110.00mm, 181mm, 0–65535
+    x, y, rz, angle, zoom = rng.uniform(_UNIFORM_LO, _UNIFORM_HI).round(2).tolist()
     sensor_data = {
-        "X": round(random.uniform(-100.0, 100.0), 2),
-        "Y": round(random.uniform(-100.0, 100.0), 2),
-        "Rz": round(random.uniform(-180.0, 180.0), 2),
-        "angle_deg": round(random.uniform(18.0, 44.0), 2),
-        "zoom_mm": round(random.uniform(55.0, 135.0), 2),
+        "X": x,
+        "Y": y,
+        "Rz": rz,
+        "angle_deg": angle,
+        "zoom_mm": zoom,
         "custom1_mm": 258.00,
         "custom2_mm": 110.00,
         "custom3_mm": 181.00,
-        "raw_value": random.randint(0, 65535)
+        "raw_value": int(rng.integers(0, 65536))
     }
     return sensor_data
 
-@app.route('/read', methods=['GET'])
-def get_sensor_data():
-    sensor_data = read_sensor_data()
-    return jsonify({
-        "device": {
-            "name": DEVICE_NAME,
-            "model": DEVICE_MODEL,
-            "manufacturer": MANUFACTURER,
-            "type": DEVICE_TYPE
-        },
-        "data": sensor_data
-    })
+# The device metadata never changes, so its JSON is rendered once and each
+# tick only serializes the data dict between the cached prefix and the
+# closing brace.
+_DEVICE_PREFIX = dump_json({"device": DEVICE_INFO})[:-1] + b',"data":'
+
+def render_payload() -> bytes:
+    return _DEVICE_PREFIX + dump_json(read_sensor_data()) + b'}'
+
+# The refresher samples the (simulated) sensor once a second and serializes
+# right away, so /read is a single reference grab plus a memcpy to the
+# socket — the JSON encode happens once per tick, not once per client.
+latest_json = render_payload()
+
+async def refresh_loop():
+    global latest_json
+    loop = asyncio.get_running_loop()
+    # Deadline-based cadence: sleeping for the remainder of the tick instead
+    # of a flat second keeps the refresher at a true 1 Hz regardless of how
+    # long the sample itself takes.
+    deadline = loop.time()
+    while True:
+        latest_json = render_payload()
+        deadline += 1.0
+        await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(refresh_loop())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get('/read')
+async def get_sensor_data():
+    return Response(content=latest_json, media_type='application/json')
 
 if __name__ == '__main__':
-    app.run(host=HTTP_HOST, port=HTTP_PORT)
\ No newline at end of file
+    import uvicorn
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    uvicorn.run(app, host=HTTP_HOST, port=HTTP_PORT)
@@ -1,8 +1,25 @@
+import io
 import os
 import serial
 import threading
-from flask import Flask, jsonify, Response
 import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+# orjson returns bytes straight from C, skipping the stdlib encoder plus the
+# .encode() step; fall back to the stdlib encoder when not installed.
+try:
+    import orjson
+except ImportError:
+    import json
+    orjson = None
+
+def dump_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
 
 # Configuration from environment variables
 SERIAL_PORT = os.environ.get('DEVICE_SERIAL_PORT', '/dev/ttyUSB0')
@@ -15,49 +32,35 @@ SERIAL_TIMEOUT = float(os.environ.get('DEVICE_SERIAL_TIMEOUT', '1.0'))
 HTTP_HOST = os.environ.get('HTTP_HOST', '0.0.0.0')
 HTTP_PORT = int(os.environ.get('HTTP_PORT', '8080'))
 
-app = Flask(__name__)
-
-# Shared state for last read
-latest_data = {
-    "raw": "",
+# Last reading, pre-serialized in the reader thread. Rebinding the module
+# global is atomic under CPython, so readers never see a torn value and no
+# lock is needed on either hot path.
+latest_json = dump_json({
     "weight": None,
     "decimal_position": None,
     "status_bits": None,
     "timestamp": None,
-}
-lock = threading.Lock()
+})
 
 def parse_rs232_line(line):
-    # Example: "+00123.45 g\r\n"
+    # Example: b"+00123.45 g\r\n"
     try:
-        line = line.strip()
-        # Find weight and unit
-        if not line:
-            return None, None, None
-        if line[0] in '+-':
-            sign = 1 if line[0] == '+' else -1
-            line_body = line[1:]
-        else:
-            sign = 1
-            line_body = line
-        # Extract weight and unit
-        parts = line_body.split()
-        if len(parts) < 2:
+        # float() handles the sign itself and partition avoids the temporary
+        # list a split would allocate, so a line costs one scan plus one
+        # conversion.
+        num, _, _ = line.strip().partition(b' ')
+        if not num:
             return None, None, None
-        weight_str, unit = parts[0], parts[1]
-        # Find decimal position
-        if '.' in weight_str:
-            decimal_pos = len(weight_str) - weight_str.index('.') - 1
-        else:
-            decimal_pos = 0
-        weight = sign * float(weight_str)
+        weight = float(num)
+        dp = num.rfind(b'.')
+        decimal_pos = 0 if dp < 0 else len(num) - dp - 1
         # Status bits generally not available in plain RS232 text, set None
         return weight, decimal_pos, None
     except Exception:
         return None, None, None
 
 def serial_reader():
-    global latest_data
+    global latest_json
     try:
         ser = serial.Serial(
             port=SERIAL_PORT,
@@ -71,36 +74,41 @@ def serial_reader():
         print("Error opening serial port:", e)
         return
 
+    # BufferedReader pulls whole chunks off the port per syscall; pyserial's
+    # own readline() reads one byte at a time.
+    reader = io.BufferedReader(ser)
     while True:
         try:
-            line = ser.readline().decode(errors='ignore')
+            line = reader.readline()
             if not line:
                 continue
             weight, decimal_position, status_bits = parse_rs232_line(line)
-            with lock:
-                latest_data["raw"] = line
-                latest_data["weight"] = weight
-                latest_data["decimal_position"] = decimal_position
-                latest_data["status_bits"] = status_bits
-                latest_data["timestamp"] = time.time()
+            latest_json = dump_json({
+                "weight": weight,
+                "decimal_position": decimal_position,
+                "status_bits": status_bits,
+                "timestamp": time.time(),
+            })
         except Exception:
             continue
 
-@app.route('/read', methods=['GET'])
-def read_weight():
-    with lock:
-        resp = {
-            "weight": latest_data["weight"],
-            "decimal_position": latest_data["decimal_position"],
-            "status_bits": latest_data["status_bits"],
-            "timestamp": latest_data["timestamp"],
-        }
-    return jsonify(resp)
-
-def main():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     thread = threading.Thread(target=serial_reader, daemon=True)
     thread.start()
-    app.run(host=HTTP_HOST, port=HTTP_PORT, threaded=True)
+    yield
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get('/read')
+async def read_weight():
+    return Response(content=latest_json, media_type='application/json')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    import uvicorn
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    uvicorn.run(app, host=HTTP_HOST, port=HTTP_PORT)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
 import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import StreamingResponse, JSONResponse
 import httpx
@@ -13,16 +14,58 @@ CAMERA_STREAM_PATH = os.getenv("CAMERA_STREAM_PATH", "/camera/stream")
 
 DEVICE_API_BASE = f"http://{DEVICE_IP}:{DEVICE_HTTP_PORT}"
 
-app = FastAPI()
+# One persistent client shared by every handler; per-request AsyncClient
+# construction paid a TCP handshake and pool setup on each call.
+client: httpx.AsyncClient = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client
+    client = httpx.AsyncClient(
+        base_url=DEVICE_API_BASE,
+        limits=httpx.Limits(max_keepalive_connections=32),
+    )
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+app = FastAPI(lifespan=lifespan)
+
+# 64 KiB reads keep the per-chunk async-frame overhead low; the bounded
+# queue lets a slow client apply backpressure without stalling the upstream
+# read mid-chunk.
+STREAM_CHUNK_SIZE = 65536
+STREAM_QUEUE_DEPTH = 8
 
 async def fetch_camera_stream():
-    url = f"{DEVICE_API_BASE}{CAMERA_STREAM_PATH}"
-    async with httpx.AsyncClient(timeout=None) as client:
-        async with client.stream("GET", url) as response:
-            if response.status_code != 200:
-                raise HTTPException(status_code=502, detail="Failed to connect to robot camera stream")
-            async for chunk in response.aiter_bytes():
-                yield chunk
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_DEPTH)
+
+    async def pump():
+        try:
+            async with client.stream("GET", CAMERA_STREAM_PATH, timeout=None) as response:
+                if response.status_code != 200:
+                    await queue.put(HTTPException(status_code=502, detail="Failed to connect to robot camera stream"))
+                    return
+                # aiter_raw skips httpx's content-decoding pass entirely —
+                # MJPEG is already compressed, so the bytes go straight from
+                # the socket buffer to the queue.
+                async for chunk in response.aiter_raw(chunk_size=STREAM_CHUNK_SIZE):
+                    await queue.put(chunk)
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(pump())
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, HTTPException):
+                raise chunk
+            yield chunk
+    finally:
+        producer.cancel()
 
 @app.get("/camera/live")
 async def camera_live():
@@ -32,33 +75,34 @@ async def camera_live():
 async def motion(req: Request):
     body = await req.json()
     # Expected body example: {"direction": "forward", "gait": "trot"}
-    url = f"{DEVICE_API_BASE}/api/motion"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=body)
-        if resp.status_code != 200:
-            return JSONResponse(status_code=502, content={"error": "Failed to send motion command", "detail": resp.text})
-        return resp.json()
+    resp = await client.post("/api/motion", json=body)
+    if resp.status_code != 200:
+        return JSONResponse(status_code=502, content={"error": "Failed to send motion command", "detail": resp.text})
+    return resp.json()
 
 @app.post("/stop")
 async def stop():
-    url = f"{DEVICE_API_BASE}/api/emergency_stop"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url)
-        if resp.status_code != 200:
-            return JSONResponse(status_code=502, content={"error": "Failed to send stop command", "detail": resp.text})
-        return resp.json()
+    resp = await client.post("/api/emergency_stop")
+    if resp.status_code != 200:
+        return JSONResponse(status_code=502, content={"error": "Failed to send stop command", "detail": resp.text})
+    return resp.json()
 
 @app.post("/voice")
 async def voice(req: Request):
     body = await req.json()
     # Expected body example: {"command": "stand"}
-    url = f"{DEVICE_API_BASE}/api/voice_command"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=body)
-        if resp.status_code != 200:
-            return JSONResponse(status_code=502, content={"error": "Failed to send voice command", "detail": resp.text})
-        return resp.json()
+    resp = await client.post("/api/voice_command", json=body)
+    if resp.status_code != 200:
+        return JSONResponse(status_code=502, content={"error": "Failed to send voice command", "detail": resp.text})
+    return resp.json()
 
 if __name__ == "__main__":
     import uvicorn
+    # uvloop's libuv-based loop roughly halves the per-chunk overhead of the
+    # /camera/live byte-pumping coroutine; fall back to asyncio when absent.
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     uvicorn.run("main:app", host=SERVER_HOST, port=SERVER_PORT, reload=False)
\ No newline at end of file
@@ -1,40 +1,13 @@
 import os
+import struct
 import sys
 from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
 
 
-def _require_env(name: str) -> str:
-    v = os.getenv(name)
-    if v is None or v == "":
-        print(f"Missing required environment variable: {name}", file=sys.stderr)
-        sys.exit(1)
-    return v
-
-
-def _require_int(name: str) -> int:
-    v = _require_env(name)
-    try:
-        return int(v)
-    except ValueError:
-        print(f"Environment variable {name} must be an integer, got: {v}", file=sys.stderr)
-        sys.exit(1)
-
-
-def _require_choice(name: str, choices):
-    v = _require_env(name)
-    if v not in choices:
-        print(f"Environment variable {name} must be one of {choices}, got: {v}", file=sys.stderr)
-        sys.exit(1)
-    return v
-
-
-def _require_dtype(name: str):
-    v = _require_env(name)
-    allowed = {"int16", "uint16", "int32", "uint32", "float32"}
-    if v not in allowed:
-        print(f"Environment variable {name} must be one of {allowed}, got: {v}", file=sys.stderr)
-        sys.exit(1)
-    return v
+def _fail(message: str):
+    print(message, file=sys.stderr)
+    sys.exit(1)
 
 
 @dataclass(frozen=True)
@@ -79,71 +52,107 @@ class Config:
     reg_map_ranges_base_addr: int | None
     map_max_entries: int | None
 
+    # Precompiled 32-bit register codec for (reg_display_value_type,
+    # word_order); None when the display value is a 16-bit type.
+    pack32: Optional[Callable[[Any], List[int]]] = None
+    unpack32: Optional[Callable[[List[int]], Any]] = None
+
+
+# struct.Struct compiles its format once, so the polling loop pays no
+# format parsing per value. Packing is unsigned with a mask (matches the
+# device's register view); unpacking restores the signed interpretation.
+_WORDS = struct.Struct(">HH")
+_PACK32 = {"int32": struct.Struct(">I"), "uint32": struct.Struct(">I"), "float32": struct.Struct(">f")}
+_UNPACK32 = {"int32": struct.Struct(">i"), "uint32": struct.Struct(">I"), "float32": struct.Struct(">f")}
+
+
+def _make_32bit_codec(dtype: str, word_order: str):
+    if dtype not in _PACK32:
+        return None, None
+    pack_st = _PACK32[dtype]
+    unpack_st = _UNPACK32[dtype]
+    # Word order is resolved here into an index pair, so the closures run
+    # without any per-call branch: (0, 1) keeps the big-endian word order,
+    # (1, 0) swaps it.
+    a, b = (1, 0) if word_order == "low_first" else (0, 1)
+
+    if dtype == "float32":
+        def pack32(value):
+            words = _WORDS.unpack(pack_st.pack(float(value)))
+            return [words[a], words[b]]
+    else:
+        def pack32(value):
+            words = _WORDS.unpack(pack_st.pack(int(value) & 0xFFFFFFFF))
+            return [words[a], words[b]]
+
+    def unpack32(regs):
+        return unpack_st.unpack(_WORDS.pack(regs[a] & 0xFFFF, regs[b] & 0xFFFF))[0]
+
+    return pack32, unpack32
+
+
+# Declarative env schema: (env var, Config field, parser). A parser is str,
+# int, or a frozenset of allowed values; the choice sets are built once here
+# instead of per call.
+_METHOD_CHOICES = frozenset({"rtu", "ascii"})
+_PARITY_CHOICES = frozenset({"N", "E", "O"})
+_WORD_ORDER_CHOICES = frozenset({"high_first", "low_first"})
+_DTYPE_CHOICES = frozenset({"int16", "uint16", "int32", "uint32", "float32"})
+
+_SCHEMA = (
+    ("HTTP_HOST", "http_host", str),
+    ("HTTP_PORT", "http_port", int),
+    ("MODBUS_METHOD", "modbus_method", _METHOD_CHOICES),
+    ("SERIAL_PORT", "serial_port", str),
+    ("SERIAL_BAUDRATE", "serial_baudrate", int),
+    ("SERIAL_PARITY", "serial_parity", _PARITY_CHOICES),
+    ("SERIAL_BYTESIZE", "serial_bytesize", int),
+    ("SERIAL_STOPBITS", "serial_stopbits", int),
+    ("MODBUS_TIMEOUT_MS", "modbus_timeout_ms", int),
+    ("MODBUS_DEVICE_ID", "modbus_device_id", int),
+    ("READ_POLL_INTERVAL_MS", "read_poll_interval_ms", int),
+    ("CONNECT_BACKOFF_MIN_MS", "connect_backoff_min_ms", int),
+    ("CONNECT_BACKOFF_MAX_MS", "connect_backoff_max_ms", int),
+    ("OPERATION_RETRIES", "operation_retries", int),
+    ("WORD_ORDER", "word_order", _WORD_ORDER_CHOICES),
+    ("REG_DISPLAY_VALUE_ADDR", "reg_display_value_addr", int),
+    ("REG_DISPLAY_VALUE_TYPE", "reg_display_value_type", _DTYPE_CHOICES),
+    ("REG_ASCII_BASE_ADDR", "reg_ascii_base_addr", int),
+    ("REG_MODE_ADDR", "reg_mode_addr", int),
+    ("REG_BLINK_MASK_ADDR", "reg_blink_mask_addr", int),
+    ("REG_NUMERIC_TYPE_ADDR", "reg_numeric_type_addr", int),
+    ("REG_DECIMAL_PLACES_ADDR", "reg_decimal_places_addr", int),
+    ("REG_TARGET_SLAVE_ID_ADDR", "reg_target_slave_id_addr", int),
+    ("REG_FUNCTION_CODE_ADDR", "reg_function_code_addr", int),
+    ("REG_TARGET_REGISTER_ADDR", "reg_target_register_addr", int),
+    ("REG_TARGET_DATA_TYPE_ADDR", "reg_target_data_type_addr", int),
+)
+
 
 def load_config() -> Config:
-    http_host = _require_env("HTTP_HOST")
-    http_port = _require_int("HTTP_PORT")
-
-    modbus_method = _require_choice("MODBUS_METHOD", {"rtu", "ascii"})
-    serial_port = _require_env("SERIAL_PORT")
-    serial_baudrate = _require_int("SERIAL_BAUDRATE")
-    serial_parity = _require_choice("SERIAL_PARITY", {"N", "E", "O"})
-    serial_bytesize = _require_int("SERIAL_BYTESIZE")
-    serial_stopbits = _require_int("SERIAL_STOPBITS")
-    modbus_timeout_ms = _require_int("MODBUS_TIMEOUT_MS")
-    modbus_device_id = _require_int("MODBUS_DEVICE_ID")
-
-    read_poll_interval_ms = _require_int("READ_POLL_INTERVAL_MS")
-    connect_backoff_min_ms = _require_int("CONNECT_BACKOFF_MIN_MS")
-    connect_backoff_max_ms = _require_int("CONNECT_BACKOFF_MAX_MS")
-    operation_retries = _require_int("OPERATION_RETRIES")
-
-    word_order = _require_choice("WORD_ORDER", {"high_first", "low_first"})
-
-    reg_display_value_addr = _require_int("REG_DISPLAY_VALUE_ADDR")
-    reg_display_value_type = _require_dtype("REG_DISPLAY_VALUE_TYPE")
-    reg_ascii_base_addr = _require_int("REG_ASCII_BASE_ADDR")
-    reg_mode_addr = _require_int("REG_MODE_ADDR")
-    reg_blink_mask_addr = _require_int("REG_BLINK_MASK_ADDR")
-    reg_numeric_type_addr = _require_int("REG_NUMERIC_TYPE_ADDR")
-    reg_decimal_places_addr = _require_int("REG_DECIMAL_PLACES_ADDR")
-    reg_target_slave_id_addr = _require_int("REG_TARGET_SLAVE_ID_ADDR")
-    reg_function_code_addr = _require_int("REG_FUNCTION_CODE_ADDR")
-    reg_target_register_addr = _require_int("REG_TARGET_REGISTER_ADDR")
-    reg_target_data_type_addr = _require_int("REG_TARGET_DATA_TYPE_ADDR")
-
-    map_base = os.getenv("REG_MAP_RANGES_BASE_ADDR")
-    reg_map_ranges_base_addr = int(map_base) if map_base not in (None, "") else None
-    map_max_entries_str = os.getenv("MAP_MAX_ENTRIES")
-    map_max_entries = int(map_max_entries_str) if map_max_entries_str not in (None, "") else None
-
-    return Config(
-        http_host=http_host,
-        http_port=http_port,
-        modbus_method=modbus_method,
-        serial_port=serial_port,
-        serial_baudrate=serial_baudrate,
-        serial_parity=serial_parity,
-        serial_bytesize=serial_bytesize,
-        serial_stopbits=serial_stopbits,
-        modbus_timeout_ms=modbus_timeout_ms,
-        modbus_device_id=modbus_device_id,
-        read_poll_interval_ms=read_poll_interval_ms,
-        connect_backoff_min_ms=connect_backoff_min_ms,
-        connect_backoff_max_ms=connect_backoff_max_ms,
-        operation_retries=operation_retries,
-        word_order=word_order,
-        reg_display_value_addr=reg_display_value_addr,
-        reg_display_value_type=reg_display_value_type,
-        reg_ascii_base_addr=reg_ascii_base_addr,
-        reg_mode_addr=reg_mode_addr,
-        reg_blink_mask_addr=reg_blink_mask_addr,
-        reg_numeric_type_addr=reg_numeric_type_addr,
-        reg_decimal_places_addr=reg_decimal_places_addr,
-        reg_target_slave_id_addr=reg_target_slave_id_addr,
-        reg_function_code_addr=reg_function_code_addr,
-        reg_target_register_addr=reg_target_register_addr,
-        reg_target_data_type_addr=reg_target_data_type_addr,
-        reg_map_ranges_base_addr=reg_map_ranges_base_addr,
-        map_max_entries=map_max_entries,
+    # One environ snapshot; each field is then a plain dict lookup.
+    env = dict(os.environ)
+    kwargs = {}
+    for name, field, parser in _SCHEMA:
+        v = env.get(name)
+        if v is None or v == "":
+            _fail(f"Missing required environment variable: {name}")
+        if parser is int:
+            try:
+                v = int(v)
+            except ValueError:
+                _fail(f"Environment variable {name} must be an integer, got: {v}")
+        elif parser is not str and v not in parser:
+            _fail(f"Environment variable {name} must be one of {set(parser)}, got: {v}")
+        kwargs[field] = v
+
+    map_base = env.get("REG_MAP_RANGES_BASE_ADDR")
+    kwargs["reg_map_ranges_base_addr"] = int(map_base) if map_base not in (None, "") else None
+    map_max_entries_str = env.get("MAP_MAX_ENTRIES")
+    kwargs["map_max_entries"] = int(map_max_entries_str) if map_max_entries_str not in (None, "") else None
+
+    kwargs["pack32"], kwargs["unpack32"] = _make_32bit_codec(
+        kwargs["reg_display_value_type"], kwargs["word_order"]
     )
+
+    return Config(**kwargs)
@@ -1,163 +1,86 @@
-import json
 import logging
-import signal
 import threading
 import time
-from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from contextlib import asynccontextmanager
 from typing import Dict, Any
 
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+
+# orjson serializes straight to bytes; fall back to the default encoder.
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as JSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse
+
 from config import load_config, Config
 from modbus_device import ModbusDisplayModule
 
 
+# strftime walks the C locale machinery on every call; within one second the
+# result is identical, so cache it at 1 s granularity.
+_ts_cache = [0.0, ""]
+_ts_lock = threading.Lock()
+
+
+def _utc_iso() -> str:
+    now = time.time()
+    if now - _ts_cache[0] >= 1.0:
+        with _ts_lock:
+            if now - _ts_cache[0] >= 1.0:
+                t = time.gmtime(now)
+                _ts_cache[1] = (
+                    f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+                    f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}Z"
+                )
+                _ts_cache[0] = now
+    return _ts_cache[1]
+
+
 class SharedState:
+    """Status is an immutable-by-convention dict swapped by reference.
+
+    CPython guarantees an attribute store is atomic, so writers build a
+    fresh dict and rebind it — readers take the current reference without
+    any lock on the /status hot path.
+    """
+
     def __init__(self):
-        self.lock = threading.Lock()
-        self.status: Dict[str, Any] = {
+        self._snapshot: Dict[str, Any] = {
             "connected": False,
             "last_update_ts": None,
         }
         self.mapping_ranges = []  # local ranges
 
     def update_status(self, data: Dict[str, Any]):
-        with self.lock:
-            self.status.update(data)
-            self.status["last_update_ts"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-            self.status["connected"] = True
+        self._snapshot = {
+            **self._snapshot,
+            **data,
+            "last_update_ts": _utc_iso(),
+            "connected": True,
+        }
 
     def set_disconnected(self):
-        with self.lock:
-            self.status["connected"] = False
-            self.status["last_update_ts"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self._snapshot = {
+            **self._snapshot,
+            "connected": False,
+            "last_update_ts": _utc_iso(),
+        }
 
     def get_status(self) -> Dict[str, Any]:
-        with self.lock:
-            return dict(self.status)
+        return self._snapshot
 
     def set_mapping_ranges(self, ranges):
-        with self.lock:
-            self.mapping_ranges = list(ranges)
-
-
-class RequestHandler(BaseHTTPRequestHandler):
-    # Silence default logs; we'll log structured
-    def log_message(self, format: str, *args):
-        logging.info("HTTP %s - %s", self.address_string(), format % args)
-
-    def _send_json(self, status_code: int, obj: Dict[str, Any]):
-        body = json.dumps(obj).encode("utf-8")
-        self.send_response(status_code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
-
-    def _read_json(self) -> Dict[str, Any]:
-        length = int(self.headers.get("Content-Length", "0"))
-        raw = self.rfile.read(length) if length > 0 else b""
-        try:
-            return json.loads(raw.decode("utf-8")) if raw else {}
-        except Exception:
-            self._send_json(400, {"error": "Invalid JSON"})
-            raise
-
-    # Endpoints:
-    # GET /status
-    # POST /display/value
-    # POST /display/ascii
-    # PUT /mode
-    # PUT /modbus/config
-    # PUT /mapping/ranges
-
-    def do_GET(self):
-        if self.path == "/status":
-            status = STATE.get_status()
-            self._send_json(200, status)
-        else:
-            self._send_json(404, {"error": "Not found"})
-
-    def do_POST(self):
-        if self.path == "/display/value":
-            try:
-                body = self._read_json()
-                if "value" not in body:
-                    return self._send_json(400, {"error": "Missing 'value'"})
-                val = body["value"]
-                DEVICE.set_display_value(val)
-                STATE.update_status({"display_value": val})
-                return self._send_json(200, {"ok": True, "value": val, "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())})
-            except Exception as e:
-                logging.exception("/display/value error: %s", e)
-                return self._send_json(500, {"error": str(e)})
-        elif self.path == "/display/ascii":
-            try:
-                body = self._read_json()
-                text = body.get("ascii", None)
-                if text is None or not isinstance(text, str):
-                    return self._send_json(400, {"error": "Missing or invalid 'ascii'"})
-                if not (1 <= len(text) <= 6):
-                    return self._send_json(400, {"error": "'ascii' must be 1..6 characters"})
-                DEVICE.set_display_ascii(text)
-                STATE.update_status({"display_ascii_1_6": text})
-                return self._send_json(200, {"ok": True, "ascii": text, "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())})
-            except Exception as e:
-                logging.exception("/display/ascii error: %s", e)
-                return self._send_json(500, {"error": str(e)})
-        else:
-            self._send_json(404, {"error": "Not found"})
-
-    def do_PUT(self):
-        if self.path == "/mode":
-            try:
-                body = self._read_json()
-                if "mode" not in body:
-                    return self._send_json(400, {"error": "Missing 'mode'"})
-                DEVICE.set_mode(int(body["mode"]))
-                STATE.update_status({"mode": int(body["mode"])})
-                return self._send_json(200, {"ok": True, "mode": int(body["mode"])})
-            except Exception as e:
-                logging.exception("/mode error: %s", e)
-                return self._send_json(500, {"error": str(e)})
-        elif self.path == "/modbus/config":
-            try:
-                body = self._read_json()
-                required = ["target_slave_id", "function_code", "target_register_addr", "target_data_type"]
-                if not all(k in body for k in required):
-                    return self._send_json(400, {"error": f"Missing fields, required: {required}"})
-                DEVICE.set_modbus_config(
-                    target_slave_id=int(body["target_slave_id"]),
-                    function_code=int(body["function_code"]),
-                    target_register_addr=int(body["target_register_addr"]),
-                    target_data_type=int(body["target_data_type"]),
-                )
-                STATE.update_status({
-                    "target_slave_id": int(body["target_slave_id"]),
-                    "function_code": int(body["function_code"]),
-                    "target_register_addr": int(body["target_register_addr"]),
-                    "target_data_type": int(body["target_data_type"]),
-                })
-                return self._send_json(200, {"ok": True})
-            except Exception as e:
-                logging.exception("/modbus/config error: %s", e)
-                return self._send_json(500, {"error": str(e)})
-        elif self.path == "/mapping/ranges":
-            try:
-                body = self._read_json()
-                ranges = body.get("ranges")
-                if ranges is None or not isinstance(ranges, list):
-                    return self._send_json(400, {"error": "Missing or invalid 'ranges' (list of objects)"})
-                DEVICE.set_mapping_ranges(ranges)
-                STATE.set_mapping_ranges(ranges)
-                return self._send_json(200, {"ok": True, "count": len(ranges)})
-            except Exception as e:
-                logging.exception("/mapping/ranges error: %s", e)
-                return self._send_json(500, {"error": str(e)})
-        else:
-            self._send_json(404, {"error": "Not found"})
+        self.mapping_ranges = list(ranges)
 
 
 def collection_loop(cfg: Config, device: ModbusDisplayModule, state: SharedState, stop_evt: threading.Event):
     backoff = cfg.connect_backoff_min_ms / 1000.0
+    poll_s = cfg.read_poll_interval_ms / 1000.0
+    # Monotonic deadline so the poll cadence does not drift by the cost of
+    # each read; max() re-anchors it after reconnects or long stalls.
+    deadline = time.monotonic()
     while not stop_evt.is_set():
         try:
             if not device.is_connected():
@@ -174,7 +97,10 @@ def collection_loop(cfg: Config, device: ModbusDisplayModule, state: SharedState
                 status = device.read_status()
                 state.update_status(status)
                 logging.debug("Polled status: %s", status)
-                stop_evt.wait(cfg.read_poll_interval_ms / 1000.0)
+                deadline = max(deadline + poll_s, time.monotonic())
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    stop_evt.wait(remaining)
             except Exception as e:
                 logging.error("Status read failed: %s", e)
                 device.close()
@@ -184,50 +110,140 @@ def collection_loop(cfg: Config, device: ModbusDisplayModule, state: SharedState
                 stop_evt.wait(backoff)
         except Exception as e:
             logging.exception("Collection loop error: %s", e)
-            stop_evt.wait(cfg.read_poll_interval_ms / 1000.0)
-
-
-def main():
-    cfg = load_config()
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(message)s",
-    )
+            stop_evt.wait(poll_s)
 
-    global DEVICE, STATE
-    DEVICE = ModbusDisplayModule(cfg)
-    STATE = SharedState()
 
-    stop_evt = threading.Event()
+CFG = load_config()
+DEVICE = ModbusDisplayModule(CFG)
+STATE = SharedState()
+_stop_evt = threading.Event()
 
-    t = threading.Thread(target=collection_loop, args=(cfg, DEVICE, STATE, stop_evt), daemon=True)
-    t.start()
 
-    httpd = ThreadingHTTPServer((cfg.http_host, cfg.http_port), RequestHandler)
-
-    def shutdown(signum=None, frame=None):
-        logging.info("Shutting down...")
-        stop_evt.set()
-        try:
-            httpd.shutdown()
-        except Exception:
-            pass
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    thread = threading.Thread(target=collection_loop, args=(CFG, DEVICE, STATE, _stop_evt), daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        _stop_evt.set()
         try:
             DEVICE.close()
         except Exception:
             pass
+        thread.join(timeout=5)
+
+
+# uvicorn's event loop replaces ThreadingHTTPServer's thread-per-request
+# model; the blocking Modbus writes run as plain-def handlers in the
+# threadpool, while /status reads the atomic snapshot without leaving the
+# loop.
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(RequestValidationError)
+async def invalid_body_handler(request, exc):
+    # Keep the pre-FastAPI contract: an unparseable or non-object body is
+    # a 400 {"error": "Invalid JSON"}, not FastAPI's 422 validation payload.
+    return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+
 
-    signal.signal(signal.SIGINT, shutdown)
-    signal.signal(signal.SIGTERM, shutdown)
+@app.get("/status")
+async def get_status():
+    return JSONResponse(STATE.get_status())
 
-    logging.info("HTTP server listening on %s:%d", cfg.http_host, cfg.http_port)
+
+@app.post("/display/value")
+def post_display_value(body: dict):
+    if "value" not in body:
+        return JSONResponse({"error": "Missing 'value'"}, status_code=400)
     try:
-        httpd.serve_forever()
-    finally:
-        shutdown()
-        t.join(timeout=5)
-        logging.info("Exited cleanly")
+        val = body["value"]
+        DEVICE.set_display_value(val)
+        STATE.update_status({"display_value": val})
+        return JSONResponse({"ok": True, "value": val, "ts": _utc_iso()})
+    except Exception as e:
+        logging.exception("/display/value error: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/display/ascii")
+def post_display_ascii(body: dict):
+    text = body.get("ascii", None)
+    if text is None or not isinstance(text, str):
+        return JSONResponse({"error": "Missing or invalid 'ascii'"}, status_code=400)
+    if not (1 <= len(text) <= 6):
+        return JSONResponse({"error": "'ascii' must be 1..6 characters"}, status_code=400)
+    try:
+        DEVICE.set_display_ascii(text)
+        STATE.update_status({"display_ascii_1_6": text})
+        return JSONResponse({"ok": True, "ascii": text, "ts": _utc_iso()})
+    except Exception as e:
+        logging.exception("/display/ascii error: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.put("/mode")
+def put_mode(body: dict):
+    if "mode" not in body:
+        return JSONResponse({"error": "Missing 'mode'"}, status_code=400)
+    try:
+        mode = int(body["mode"])
+        DEVICE.set_mode(mode)
+        STATE.update_status({"mode": mode})
+        return JSONResponse({"ok": True, "mode": mode})
+    except Exception as e:
+        logging.exception("/mode error: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.put("/modbus/config")
+def put_modbus_config(body: dict):
+    required = ["target_slave_id", "function_code", "target_register_addr", "target_data_type"]
+    if not all(k in body for k in required):
+        return JSONResponse({"error": f"Missing fields, required: {required}"}, status_code=400)
+    try:
+        fields = {
+            "target_slave_id": int(body["target_slave_id"]),
+            "function_code": int(body["function_code"]),
+            "target_register_addr": int(body["target_register_addr"]),
+            "target_data_type": int(body["target_data_type"]),
+        }
+        DEVICE.set_modbus_config(**fields)
+        STATE.update_status(fields)
+        return JSONResponse({"ok": True})
+    except Exception as e:
+        logging.exception("/modbus/config error: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.put("/mapping/ranges")
+def put_mapping_ranges(body: dict):
+    ranges = body.get("ranges")
+    if ranges is None or not isinstance(ranges, list):
+        return JSONResponse({"error": "Missing or invalid 'ranges' (list of objects)"}, status_code=400)
+    try:
+        DEVICE.set_mapping_ranges(ranges)
+        STATE.set_mapping_ranges(ranges)
+        return JSONResponse({"ok": True, "count": len(ranges)})
+    except Exception as e:
+        logging.exception("/mapping/ranges error: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    import uvicorn
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    logging.info("HTTP server listening on %s:%d", CFG.http_host, CFG.http_port)
+    uvicorn.run(app, host=CFG.http_host, port=CFG.http_port)
 
 
 if __name__ == "__main__":
@@ -1,30 +1,110 @@
 import logging
 import struct
 import time
-from typing import List, Optional, Dict, Any
-
-# Pymodbus import compatibility across versions
-try:
-    from pymodbus.client import ModbusSerialClient
-except Exception:
-    try:
-        from pymodbus.client.sync import ModbusSerialClient  # type: ignore
-    except Exception as e:  # pragma: no cover
-        raise RuntimeError("pymodbus is required. Please install via 'pip install pymodbus'.") from e
+from typing import Any, Dict, List, Sequence
 
 from config import Config
 
+# Pymodbus import compatibility across versions, resolved lazily so the
+# module itself imports instantly; the class is cached after first use.
+_CLIENT_CLS = None
+
+
+def _get_client_cls():
+    global _CLIENT_CLS
+    if _CLIENT_CLS is None:
+        try:
+            from pymodbus.client import ModbusSerialClient
+        except Exception:
+            try:
+                from pymodbus.client.sync import ModbusSerialClient  # type: ignore
+            except Exception as e:  # pragma: no cover
+                raise RuntimeError("pymodbus is required. Please install via 'pip install pymodbus'.") from e
+        _CLIENT_CLS = ModbusSerialClient
+    return _CLIENT_CLS
+
+# Low bytes of the six ASCII registers are extracted in C via Struct.pack
+# plus a byte-stride slice; NULs render as spaces through the translate map.
+_ASCII_6H = struct.Struct(">6H")
+_ASCII_TR = str.maketrans({"\x00": " "})
+
+# Registers this close together are fetched in one block read; the wasted
+# in-between registers are far cheaper than another RTU round-trip.
+_READ_GAP_THRESHOLD = 8
+
 
 class ModbusDisplayModule:
     def __init__(self, cfg: Config):
         self.cfg = cfg
-        self.client: Optional[ModbusSerialClient] = None
+        self.client = None
         self.connected = False
         self._mapping_ranges: List[Dict[str, int]] = []
+        self._read_plan = self._build_read_plan()
+        # O(1) dtype dispatch instead of walking an if/elif chain of string
+        # comparisons on every conversion.
+        self._packers = {
+            "int16": self._pack_int16,
+            "uint16": self._pack_uint16,
+            "int32": self._pack_int32,
+            "uint32": self._pack_uint32,
+            "float32": self._pack_float32,
+        }
+        self._unpackers = {
+            "int16": self._unpack_int16,
+            "uint16": self._unpack_uint16,
+            "int32": self._unpack_32,
+            "uint32": self._unpack_32,
+            "float32": self._unpack_32,
+        }
+        # Skeleton reused via .copy() each poll — cheaper than rebuilding a
+        # 10-key dict literal per cycle.
+        self._status_template: Dict[str, Any] = {
+            "display_value": None,
+            "display_ascii_1_6": None,
+            "blink_mask": None,
+            "numeric_type": None,
+            "decimal_places": None,
+            "mode": None,
+            "target_slave_id": None,
+            "function_code": None,
+            "target_register_addr": None,
+            "target_data_type": None,
+        }
+
+    def _build_read_plan(self):
+        """Group the status registers into maximal block reads.
+
+        Returns a list of (base, count, members) where members are
+        (field_name, offset, count) tuples into the block.
+        """
+        cfg = self.cfg
+        dv_count = 1 if cfg.reg_display_value_type in ("int16", "uint16") else 2
+        fields = [
+            ("display_value", cfg.reg_display_value_addr, dv_count),
+            ("ascii", cfg.reg_ascii_base_addr, 6),
+            ("blink_mask", cfg.reg_blink_mask_addr, 1),
+            ("numeric_type", cfg.reg_numeric_type_addr, 1),
+            ("decimal_places", cfg.reg_decimal_places_addr, 1),
+            ("mode", cfg.reg_mode_addr, 1),
+            ("target_slave_id", cfg.reg_target_slave_id_addr, 1),
+            ("function_code", cfg.reg_function_code_addr, 1),
+            ("target_register_addr", cfg.reg_target_register_addr, 1),
+            ("target_data_type", cfg.reg_target_data_type_addr, 1),
+        ]
+        fields.sort(key=lambda f: f[1])
+        groups = []
+        for name, addr, count in fields:
+            if groups and addr - (groups[-1][0] + groups[-1][1]) <= _READ_GAP_THRESHOLD:
+                base, span, members = groups[-1]
+                members.append((name, addr - base, count))
+                groups[-1] = (base, max(span, addr + count - base), members)
+            else:
+                groups.append((addr, count, [(name, 0, count)]))
+        return groups
 
     def connect(self) -> bool:
         if self.client is None:
-            self.client = ModbusSerialClient(
+            self.client = _get_client_cls()(
                 method=self.cfg.modbus_method,
                 port=self.cfg.serial_port,
                 baudrate=self.cfg.serial_baudrate,
@@ -36,11 +116,25 @@ class ModbusDisplayModule:
         ok = bool(self.client.connect())
         self.connected = ok
         if ok:
+            self._enable_low_latency()
             logging.info("Modbus connected to %s (%s %s baud)", self.cfg.serial_port, self.cfg.modbus_method, self.cfg.serial_baudrate)
         else:
             logging.error("Modbus connect failed to %s", self.cfg.serial_port)
         return ok
 
+    def _enable_low_latency(self):
+        # On Linux, ASYNC_LOW_LATENCY drops the UART driver's wakeup
+        # granularity from the ~10 ms tick to ~1 ms, shortening every RTU
+        # round-trip. pyserial wraps the TIOCSSERIAL ioctl for us; best
+        # effort only, since USB adapters and other platforms may refuse it.
+        ser = getattr(self.client, "socket", None)
+        if ser is None or not hasattr(ser, "set_low_latency_mode"):
+            return
+        try:
+            ser.set_low_latency_mode(True)
+        except Exception as e:
+            logging.debug("Low-latency serial mode unavailable: %s", e)
+
     def close(self):
         try:
             if self.client:
@@ -67,7 +161,7 @@ class ModbusDisplayModule:
                 time.sleep(0.05 * attempt)
         raise last_exc  # type: ignore
 
-    def read_holding(self, address: int, count: int) -> List[int]:
+    def read_holding(self, address: int, count: int) -> Sequence[int]:
         resp = self._retry_call(
             self.client.read_holding_registers,  # type: ignore
             address=address,
@@ -77,7 +171,9 @@ class ModbusDisplayModule:
         regs = getattr(resp, "registers", None)
         if regs is None:
             raise RuntimeError("No registers in response")
-        return list(regs)
+        # Returned as-is; callers only index/slice, so the defensive list()
+        # copy per transaction was pure allocation overhead.
+        return regs
 
     def write_single(self, address: int, value: int) -> None:
         self._retry_call(
@@ -96,83 +192,59 @@ class ModbusDisplayModule:
         )
 
     # Packing / unpacking helpers
+    def _pack_int16(self, value: Any) -> List[int]:
+        val = int(value)
+        if not (-32768 <= val <= 65535):
+            raise ValueError("int16 value out of range")
+        # For uint16, accept 0..65535; int16 negative also fits in 16 bits. We'll mask to 16 bits.
+        return [val & 0xFFFF]
+
+    def _pack_uint16(self, value: Any) -> List[int]:
+        val = int(value)
+        if not (0 <= val <= 65535):
+            raise ValueError("uint16 value out of range")
+        return [val & 0xFFFF]
+
+    def _pack_int32(self, value: Any) -> List[int]:
+        val = int(value)
+        if not (-2147483648 <= val <= 4294967295):
+            raise ValueError("int32 value out of range")
+        # cfg.pack32 is the Struct-backed codec precompiled in load_config
+        # for this dtype/word_order pair.
+        return self.cfg.pack32(val)
+
+    def _pack_uint32(self, value: Any) -> List[int]:
+        val = int(value)
+        if not (0 <= val <= 0xFFFFFFFF):
+            raise ValueError("uint32 value out of range")
+        return self.cfg.pack32(val)
+
+    def _pack_float32(self, value: Any) -> List[int]:
+        return self.cfg.pack32(float(value))
+
     def _pack_value(self, value: Any, dtype: str) -> List[int]:
-        if dtype == "int16":
-            val = int(value)
-            if not (-32768 <= val <= 65535):
-                raise ValueError("int16 value out of range")
-            # For uint16, accept 0..65535; int16 negative also fits in 16 bits. We'll mask to 16 bits.
-            return [val & 0xFFFF]
-        elif dtype == "uint16":
-            val = int(value)
-            if not (0 <= val <= 65535):
-                raise ValueError("uint16 value out of range")
-            return [val & 0xFFFF]
-        elif dtype == "int32":
-            val = int(value)
-            if not (-2147483648 <= val <= 4294967295):
-                raise ValueError("int32 value out of range")
-            packed = struct.pack(
-                ">I" if val >= 0 else ">i",
-                val if val >= 0 else val,
-            )
-            hi = (packed[0] << 8) | packed[1]
-            lo = (packed[2] << 8) | packed[3]
-            if self.cfg.word_order == "high_first":
-                return [hi, lo]
-            else:
-                return [lo, hi]
-        elif dtype == "uint32":
-            val = int(value)
-            if not (0 <= val <= 0xFFFFFFFF):
-                raise ValueError("uint32 value out of range")
-            packed = struct.pack(">I", val)
-            hi = (packed[0] << 8) | packed[1]
-            lo = (packed[2] << 8) | packed[3]
-            if self.cfg.word_order == "high_first":
-                return [hi, lo]
-            else:
-                return [lo, hi]
-        elif dtype == "float32":
-            val = float(value)
-            packed = struct.pack(">f", val)
-            hi = (packed[0] << 8) | packed[1]
-            lo = (packed[2] << 8) | packed[3]
-            if self.cfg.word_order == "high_first":
-                return [hi, lo]
-            else:
-                return [lo, hi]
-        else:
+        packer = self._packers.get(dtype)
+        if packer is None:
             raise ValueError(f"Unsupported dtype: {dtype}")
+        return packer(value)
 
-    def _unpack_value(self, regs: List[int], dtype: str) -> Any:
-        if dtype in ("int16", "uint16"):
-            raw = regs[0] & 0xFFFF
-            if dtype == "int16":
-                if raw >= 0x8000:
-                    raw = raw - 0x10000
-                return int(raw)
-            else:
-                return int(raw)
-        elif dtype in ("int32", "uint32", "float32"):
-            if len(regs) < 2:
-                raise ValueError("Need 2 registers for 32-bit value")
-            if self.cfg.word_order == "high_first":
-                hi, lo = regs[0] & 0xFFFF, regs[1] & 0xFFFF
-            else:
-                lo, hi = regs[0] & 0xFFFF, regs[1] & 0xFFFF
-            b = bytes([(hi >> 8) & 0xFF, hi & 0xFF, (lo >> 8) & 0xFF, lo & 0xFF])
-            if dtype == "int32":
-                val = struct.unpack(">i", b)[0]
-                return int(val)
-            elif dtype == "uint32":
-                val = struct.unpack(">I", b)[0]
-                return int(val)
-            else:
-                val = struct.unpack(">f", b)[0]
-                return float(val)
-        else:
+    def _unpack_int16(self, regs: Sequence[int]) -> int:
+        raw = regs[0] & 0xFFFF
+        return raw - 0x10000 if raw >= 0x8000 else raw
+
+    def _unpack_uint16(self, regs: Sequence[int]) -> int:
+        return regs[0] & 0xFFFF
+
+    def _unpack_32(self, regs: Sequence[int]) -> Any:
+        if len(regs) < 2:
+            raise ValueError("Need 2 registers for 32-bit value")
+        return self.cfg.unpack32(regs)
+
+    def _unpack_value(self, regs: Sequence[int], dtype: str) -> Any:
+        unpacker = self._unpackers.get(dtype)
+        if unpacker is None:
             raise ValueError(f"Unsupported dtype: {dtype}")
+        return unpacker(regs)
 
     # Device operations
     def set_display_value(self, value: Any) -> None:
@@ -181,7 +253,7 @@ class ModbusDisplayModule:
             self.write_single(self.cfg.reg_display_value_addr, regs[0])
         else:
             self.write_multi(self.cfg.reg_display_value_addr, regs)
-        logging.info("Set display value: %s -> regs %s", value, regs)
+        logging.debug("Set display value: %s -> regs %s", value, regs)
 
     def set_display_ascii(self, text: str) -> None:
         if not (1 <= len(text) <= 6):
@@ -192,18 +264,18 @@ class ModbusDisplayModule:
         while len(regs) < 6:
             regs.append(0)
         self.write_multi(self.cfg.reg_ascii_base_addr, regs)
-        logging.info("Set display ascii: '%s' -> regs %s", text, regs)
+        logging.debug("Set display ascii: '%s' -> regs %s", text, regs)
 
     def set_mode(self, mode: int) -> None:
         self.write_single(self.cfg.reg_mode_addr, int(mode) & 0xFFFF)
-        logging.info("Set mode: %s", mode)
+        logging.debug("Set mode: %s", mode)
 
     def set_modbus_config(self, target_slave_id: int, function_code: int, target_register_addr: int, target_data_type: int) -> None:
         self.write_single(self.cfg.reg_target_slave_id_addr, int(target_slave_id) & 0xFFFF)
         self.write_single(self.cfg.reg_function_code_addr, int(function_code) & 0xFFFF)
         self.write_single(self.cfg.reg_target_register_addr, int(target_register_addr) & 0xFFFF)
         self.write_single(self.cfg.reg_target_data_type_addr, int(target_data_type) & 0xFFFF)
-        logging.info(
+        logging.debug(
             "Set modbus config: target_slave_id=%s function_code=%s target_register_addr=%s target_data_type=%s",
             target_slave_id,
             function_code,
@@ -222,66 +294,48 @@ class ModbusDisplayModule:
                 "input_max": int(r["input_max"]),
                 "output_value": int(r["output_value"]),
             })
-        logging.info("Updated local mapping ranges: %d entries", len(self._mapping_ranges))
+        logging.debug("Updated local mapping ranges: %d entries", len(self._mapping_ranges))
         # Optionally push to device if base address provided
         if self.cfg.reg_map_ranges_base_addr is not None and self.cfg.map_max_entries is not None:
             max_entries = self.cfg.map_max_entries
             entries = self._mapping_ranges[:max_entries]
-            # Each entry uses 3 registers: input_min, input_max, output_value
+            # Each entry uses 3 registers: input_min, input_max, output_value.
+            # Flatten the whole table (unused slots zeroed) and push it in as
+            # few write transactions as the 123-register Modbus limit allows,
+            # instead of one round-trip per entry plus one per cleared slot.
             base = self.cfg.reg_map_ranges_base_addr
-            # Write entries sequentially
+            vals = [0] * (max_entries * 3)
             for idx, entry in enumerate(entries):
-                addr = base + idx * 3
-                vals = [entry["input_min"] & 0xFFFF, entry["input_max"] & 0xFFFF, entry["output_value"] & 0xFFFF]
-                self.write_multi(addr, vals)
-            # Clear remaining slots if fewer than max_entries
-            for idx in range(len(entries), max_entries):
-                addr = base + idx * 3
-                vals = [0, 0, 0]
-                self.write_multi(addr, vals)
-            logging.info("Pushed %d mapping range entries to device starting at 0x%X", len(entries), base)
+                vals[idx * 3:idx * 3 + 3] = [
+                    entry["input_min"] & 0xFFFF,
+                    entry["input_max"] & 0xFFFF,
+                    entry["output_value"] & 0xFFFF,
+                ]
+            for off in range(0, len(vals), 120):
+                self.write_multi(base + off, vals[off:off + 120])
+            logging.debug("Pushed %d mapping range entries to device starting at 0x%X", len(entries), base)
 
     def read_status(self) -> Dict[str, Any]:
-        # Read display value
-        dv_type = self.cfg.reg_display_value_type
-        dv_count = 1 if dv_type in ("int16", "uint16") else 2
-        dv_regs = self.read_holding(self.cfg.reg_display_value_addr, dv_count)
-        display_value = self._unpack_value(dv_regs, dv_type)
-
-        # Read ASCII 6 registers
-        ascii_regs = self.read_holding(self.cfg.reg_ascii_base_addr, 6)
-        ascii_chars = []
-        for r in ascii_regs:
-            code = r & 0xFF
-            if code == 0:
-                ascii_chars.append(" ")
-            else:
-                try:
-                    ascii_chars.append(chr(code))
-                except ValueError:
-                    ascii_chars.append("?")
-        display_ascii = "".join(ascii_chars)
-
-        # Other fields
-        blink_mask = self.read_holding(self.cfg.reg_blink_mask_addr, 1)[0] & 0xFFFF
-        numeric_type = self.read_holding(self.cfg.reg_numeric_type_addr, 1)[0] & 0xFFFF
-        decimal_places = self.read_holding(self.cfg.reg_decimal_places_addr, 1)[0] & 0xFFFF
-        mode = self.read_holding(self.cfg.reg_mode_addr, 1)[0] & 0xFFFF
-
-        target_slave_id = self.read_holding(self.cfg.reg_target_slave_id_addr, 1)[0] & 0xFFFF
-        function_code = self.read_holding(self.cfg.reg_function_code_addr, 1)[0] & 0xFFFF
-        target_register_addr = self.read_holding(self.cfg.reg_target_register_addr, 1)[0] & 0xFFFF
-        target_data_type = self.read_holding(self.cfg.reg_target_data_type_addr, 1)[0] & 0xFFFF
-
-        return {
-            "display_value": display_value,
-            "display_ascii_1_6": display_ascii,
-            "blink_mask": blink_mask,
-            "numeric_type": numeric_type,
-            "decimal_places": decimal_places,
-            "mode": mode,
-            "target_slave_id": target_slave_id,
-            "function_code": function_code,
-            "target_register_addr": target_register_addr,
-            "target_data_type": target_data_type,
-        }
+        # One block read per register group from the precomputed plan,
+        # sliced locally — typically 1-2 serial round-trips instead of 10.
+        regs: Dict[str, Sequence[int]] = {}
+        for base, count, members in self._read_plan:
+            block = self.read_holding(base, count)
+            for name, offset, width in members:
+                regs[name] = block[offset:offset + width]
+
+        out = self._status_template.copy()
+        out["display_value"] = self._unpack_value(regs["display_value"], self.cfg.reg_display_value_type)
+
+        low = _ASCII_6H.pack(*(r & 0xFFFF for r in regs["ascii"]))[1::2]
+        out["display_ascii_1_6"] = low.decode("latin-1").translate(_ASCII_TR)
+
+        out["blink_mask"] = regs["blink_mask"][0] & 0xFFFF
+        out["numeric_type"] = regs["numeric_type"][0] & 0xFFFF
+        out["decimal_places"] = regs["decimal_places"][0] & 0xFFFF
+        out["mode"] = regs["mode"][0] & 0xFFFF
+        out["target_slave_id"] = regs["target_slave_id"][0] & 0xFFFF
+        out["function_code"] = regs["function_code"][0] & 0xFFFF
+        out["target_register_addr"] = regs["target_register_addr"][0] & 0xFFFF
+        out["target_data_type"] = regs["target_data_type"][0] & 0xFFFF
+        return out
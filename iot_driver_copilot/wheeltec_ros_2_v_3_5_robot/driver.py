@@ -4,6 +4,24 @@ import time
 import yaml
 import threading
 
+# libyaml's C loader parses 10-30x faster than the pure-Python one; same
+# safe_load semantics either way.
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    import orjson
+except ImportError:
+    import json
+    orjson = None
+
+def dump_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
+
 from kubernetes import client, config, watch
 from kubernetes.client.rest import ApiException
 import paho.mqtt.client as mqtt
@@ -68,22 +86,50 @@ class EdgeDeviceStatusManager:
                 print(f"Failed to update status: {e}", file=sys.stderr)
 
 class InstructionLoader:
+    # The numeric protocol properties and their defaults; coerced once at
+    # load time so callers never re-run float()/int() per command.
+    _TYPED_FIELDS = (
+        # QoS 0 by default: velocity commands are a realtime stream where a
+        # fresh twist supersedes a lost one, so waiting on PUBACK per
+        # command only adds a broker round-trip. Instructions can still
+        # raise it.
+        ("qos", int, 0),
+        ("linear_speed", float, 0.2),
+        ("angular_speed", float, 0.5),
+    )
+
     def __init__(self, path):
         self.instructions = {}
+        self._default_typed = {key: default for key, _, default in self._TYPED_FIELDS}
+        self._api_typed = {}
         self._load(path)
 
     def _load(self, path):
         try:
             with open(path, "r") as f:
-                self.instructions = yaml.safe_load(f)
+                self.instructions = yaml.load(f, Loader=_YamlLoader) or {}
         except Exception as e:
             print(f"Failed to load instructions: {e}", file=sys.stderr)
             self.instructions = {}
+        self._api_typed = {}
+        for name, spec in self.instructions.items():
+            props = (spec or {}).get('protocolPropertyList', {}) or {}
+            self._api_typed[name] = {
+                key: cast(props.get(key, default))
+                for key, cast, default in self._TYPED_FIELDS
+            }
 
     def get_api_settings(self, api_name):
         return self.instructions.get(api_name, {}).get('protocolPropertyList', {})
 
+    def get_typed(self, api_name):
+        return self._api_typed.get(api_name, self._default_typed)
+
 class MQTTDeviceShifu:
+    # Constant at code time — no reason to rebuild the topic string or its
+    # settings key on every publish.
+    _TOPIC_CMD_VEL = "device/commands/cmd_vel"
+
     def __init__(self):
         self.edgedevice_name = get_env_var("EDGEDEVICE_NAME")
         self.edgedevice_namespace = get_env_var("EDGEDEVICE_NAMESPACE")
@@ -91,12 +137,13 @@ class MQTTDeviceShifu:
         self.status_manager = EdgeDeviceStatusManager(self.edgedevice_name, self.edgedevice_namespace)
         self.address = self.status_manager.get_address()
         self.instruction_loader = InstructionLoader(INSTRUCTION_PATH)
+        self._build_cmd_payloads()
         self.client = None
         self.connected = False
         self._client_id = f"wheeletec-shifu-{self.edgedevice_name}"
         self._connect_lock = threading.Lock()
-        self._phase_thread = threading.Thread(target=self._monitor_phase, daemon=True)
-        self._phase_thread.start()
+        self._watch_thread = threading.Thread(target=self._watch_edgedevice, daemon=True)
+        self._watch_thread.start()
         self._init_mqtt()
 
     def _init_mqtt(self):
@@ -140,17 +187,49 @@ class MQTTDeviceShifu:
             self.connected = False
             self.status_manager.update_phase(PHASE_PENDING if rc != 0 else PHASE_UNKNOWN)
 
-    def _monitor_phase(self):
-        # Periodically check if still connected and update status
+    def _watch_edgedevice(self):
+        # The MQTT callbacks already patch the phase on real transitions;
+        # re-asserting it every 10 s only loaded the API server. The watch
+        # is a long poll, so spec changes (e.g. a new address) arrive as
+        # MODIFIED events at near-zero steady-state cost.
+        w = watch.Watch()
         while True:
-            with self._connect_lock:
-                if self.client is None:
-                    self.status_manager.update_phase(PHASE_UNKNOWN)
-                elif self.connected:
-                    self.status_manager.update_phase(PHASE_RUNNING)
-                else:
-                    self.status_manager.update_phase(PHASE_PENDING)
-            time.sleep(10)
+            try:
+                for event in w.stream(
+                        self.status_manager.api.list_namespaced_custom_object,
+                        group=EDGEDEVICE_GROUP,
+                        version=EDGEDEVICE_VERSION,
+                        namespace=self.edgedevice_namespace,
+                        plural=EDGEDEVICE_PLURAL,
+                        field_selector=f"metadata.name={self.edgedevice_name}",
+                        timeout_seconds=300):
+                    if event.get("type") == "MODIFIED":
+                        obj = event.get("object", {})
+                        self.address = obj.get("spec", {}).get("address", self.address)
+            except Exception as e:
+                print(f"EdgeDevice watch failed: {e}", file=sys.stderr)
+                time.sleep(5)
+
+    def _build_cmd_payloads(self):
+        # The direction set is closed and the speeds come from instructions
+        # loaded once at startup, so all four Twist messages can be
+        # serialized ahead of time; each publish is then a dict lookup.
+        api_settings = self.instruction_loader.get_typed(self._TOPIC_CMD_VEL)
+        self._cmd_qos = api_settings["qos"]
+        linear_speed = api_settings["linear_speed"]
+        angular_speed = api_settings["angular_speed"]
+        self._cmd_payloads = {}
+        for direction, linear_x, angular_z in (
+                ("forward", linear_speed, 0),
+                ("backward", -linear_speed, 0),
+                ("left", 0, angular_speed),
+                ("right", 0, -angular_speed)):
+            # ROS2 Twist msg: { "linear": {"x": ..., "y": ..., "z": ...}, "angular": {"x": ..., "y": ..., "z": ...} }
+            twist = {
+                "linear": {"x": linear_x, "y": 0, "z": 0},
+                "angular": {"x": 0, "y": 0, "z": angular_z},
+            }
+            self._cmd_payloads[direction] = (twist, dump_json(twist))
 
     def publish_cmd_vel(self, direction):
         """
@@ -159,39 +238,14 @@ class MQTTDeviceShifu:
         if not self.connected:
             return {"error": "MQTT client not connected"}, 503
 
-        # Load settings for API
-        api_settings = self.instruction_loader.get_api_settings("device/commands/cmd_vel")
-        topic = "device/commands/cmd_vel"
-        qos = int(api_settings.get("qos", 1))  # default 1
-
-        # Default speed values, can be overridden by settings
-        linear_speed = float(api_settings.get("linear_speed", 0.2))
-        angular_speed = float(api_settings.get("angular_speed", 0.5))
-
-        # Compose cmd_vel message in ROS2 Twist format (as JSON for MQTT)
-        # ROS2 Twist msg: { "linear": {"x": ..., "y": ..., "z": ...}, "angular": {"x": ..., "y": ..., "z": ...} }
-        linear = {"x": 0, "y": 0, "z": 0}
-        angular = {"x": 0, "y": 0, "z": 0}
-
-        if direction == "forward":
-            linear["x"] = linear_speed
-        elif direction == "backward":
-            linear["x"] = -linear_speed
-        elif direction == "left":
-            angular["z"] = angular_speed
-        elif direction == "right":
-            angular["z"] = -angular_speed
-        else:
+        entry = self._cmd_payloads.get(direction)
+        if entry is None:
             return {"error": "Invalid direction. Use forward/backward/left/right"}, 400
-
-        payload = {
-            "linear": linear,
-            "angular": angular
-        }
+        payload, raw = entry
+        topic = self._TOPIC_CMD_VEL
 
         try:
-            import json
-            result = self.client.publish(topic, json.dumps(payload), qos=qos)
+            result = self.client.publish(topic, raw, qos=self._cmd_qos, retain=False)
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
                 return {"status": "published", "topic": topic, "payload": payload}, 200
             else:
@@ -215,4 +269,10 @@ def api_cmd_vel():
 
 if __name__ == "__main__":
     port = int(os.getenv("SHIFU_HTTP_PORT", "8080"))
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    # waitress is a real threaded WSGI server with keep-alive; Flask's dev
+    # server stays as the fallback for bare environments.
+    try:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=port, threads=16)
+    except ImportError:
+        app.run(host='0.0.0.0', port=port)
\ No newline at end of file
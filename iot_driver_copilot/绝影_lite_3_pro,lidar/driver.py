@@ -1,8 +1,11 @@
+import gzip
+import io
+import math
 import os
 import threading
 import json
 import time
-from flask import Flask, request, Response, jsonify
+from flask import Flask, request, Response
 import rospy
 from geometry_msgs.msg import Twist, PoseWithCovarianceStamped, PoseStamped
 from nav_msgs.msg import Odometry
@@ -10,6 +13,44 @@ from sensor_msgs.msg import Imu, JointState, Image, PointCloud2
 from std_msgs.msg import Header
 from cv_bridge import CvBridge
 import numpy as np
+# Hoisted out of the handlers/callbacks: a function-local import still
+# takes the import lock and a sys.modules lookup on every call, which at
+# 30 Hz depth frames contends with ROS's own threads.
+import cv2
+
+def _yaw_quat(theta):
+    # quaternion_from_euler(0, 0, theta) builds and multiplies three
+    # rotation matrices to arrive at exactly this; with roll = pitch = 0
+    # the quaternion is just (0, 0, sin(h), cos(h)).
+    h = 0.5 * theta
+    return (0.0, 0.0, math.sin(h), math.cos(h))
+
+# orjson serializes straight to bytes (and understands numpy arrays);
+# stdlib json stays as the fallback.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dump_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload).encode("utf-8")
+
+# With orjson, joint arrays go to the serializer as numpy views — no
+# Python float boxed per joint; stdlib json needs real lists.
+import array as _array
+
+if orjson is not None:
+    def _as_seq(seq):
+        # rospy deserializes float64[] fields into array.array('d');
+        # frombuffer wraps that buffer zero-copy. Anything else (tuples on
+        # older rospy) still goes through asarray.
+        if isinstance(seq, _array.array):
+            return np.frombuffer(seq, dtype=np.float64)
+        return np.asarray(seq)
+else:
+    _as_seq = list
 
 # Environment Variables
 ROS_MASTER_URI = os.environ.get("ROS_MASTER_URI", "http://localhost:11311")
@@ -22,8 +63,30 @@ os.environ["ROS_HOSTNAME"] = ROS_HOSTNAME
 
 app = Flask(__name__)
 
+def _json(obj, status=200):
+    # jsonify routes through stdlib json; dump_json keeps every response on
+    # the orjson path when it is installed.
+    return app.response_class(dump_json(obj), status=status,
+                              mimetype="application/json")
+
+# /sdata JSON is dominated by repeated key names, which level-1 gzip cuts
+# 5-10x for a few percent CPU. The raw point-cloud bytes stay uncompressed:
+# packed float fields barely shrink.
+GZIP_MIN_SIZE = 512
+
+def _gzip_json(body):
+    if len(body) >= GZIP_MIN_SIZE and "gzip" in request.headers.get("Accept-Encoding", ""):
+        resp = app.response_class(gzip.compress(body, 1), mimetype="application/json")
+        resp.headers["Content-Encoding"] = "gzip"
+        return resp
+    return app.response_class(body, mimetype="application/json")
+
 rospy_inited = False
-data_lock = threading.Lock()
+# Callbacks store whole message references with single dict-item
+# assignments, which are atomic under the GIL — no lock anywhere on the
+# subscriber or handler side. The JSON-friendly dicts are built lazily in
+# the HTTP handlers, so the 100-500 Hz callback rate costs one pointer
+# store per message instead of a ~20-key nested dict allocation.
 latest_data = {
     "leg_odom": None,
     "imu": None,
@@ -34,167 +97,375 @@ latest_data = {
 
 bridge = CvBridge()
 
+# pyspng encodes PNG several times faster than libpng at its default
+# level; optional, with OpenCV at compression level 1 as the fallback.
+try:
+    import pyspng
+except ImportError:
+    pyspng = None
+
+def encode_depth_png(cv_img):
+    if pyspng is not None:
+        try:
+            return pyspng.encode(cv_img, compress_level=1)
+        except Exception:
+            pass
+    ret, buf = cv2.imencode('.png', cv_img, [int(cv2.IMWRITE_PNG_COMPRESSION), 1])
+    if not ret:
+        return None
+    return buf.tobytes()
+
 def init_ros():
     global rospy_inited
     if not rospy_inited:
         rospy.init_node("device_http_driver", anonymous=True, disable_signals=True)
         rospy_inited = True
 
+# Set by the scalar-topic callbacks so stream consumers wake on new data
+# instead of polling.
+_sdata_event = threading.Event()
+
 def odom_callback(msg):
-    with data_lock:
-        latest_data["leg_odom"] = {
-            "pose": {
-                "position": {
-                    "x": msg.pose.pose.position.x,
-                    "y": msg.pose.pose.position.y,
-                    "z": msg.pose.pose.position.z,
-                },
-                "orientation": {
-                    "x": msg.pose.pose.orientation.x,
-                    "y": msg.pose.pose.orientation.y,
-                    "z": msg.pose.pose.orientation.z,
-                    "w": msg.pose.pose.orientation.w,
-                },
-            },
-            "twist": {
-                "linear": {
-                    "x": msg.twist.twist.linear.x,
-                    "y": msg.twist.twist.linear.y,
-                    "z": msg.twist.twist.linear.z,
-                },
-                "angular": {
-                    "x": msg.twist.twist.angular.x,
-                    "y": msg.twist.twist.angular.y,
-                    "z": msg.twist.twist.angular.z,
-                },
-            },
-            "header": {
-                "stamp": msg.header.stamp.to_sec(),
-                "frame_id": msg.header.frame_id,
-            }
-        }
+    latest_data["leg_odom"] = msg
+    _sdata_event.set()
 
 def imu_callback(msg):
-    with data_lock:
-        latest_data["imu"] = {
+    latest_data["imu"] = msg
+    _sdata_event.set()
+
+def joint_states_callback(msg):
+    latest_data["joint_states"] = msg
+    _sdata_event.set()
+
+def _odom_dict(msg):
+    pose = msg.pose.pose
+    twist = msg.twist.twist
+    return {
+        "pose": {
+            "position": {
+                "x": pose.position.x,
+                "y": pose.position.y,
+                "z": pose.position.z,
+            },
             "orientation": {
-                "x": msg.orientation.x,
-                "y": msg.orientation.y,
-                "z": msg.orientation.z,
-                "w": msg.orientation.w,
+                "x": pose.orientation.x,
+                "y": pose.orientation.y,
+                "z": pose.orientation.z,
+                "w": pose.orientation.w,
             },
-            "angular_velocity": {
-                "x": msg.angular_velocity.x,
-                "y": msg.angular_velocity.y,
-                "z": msg.angular_velocity.z,
+        },
+        "twist": {
+            "linear": {
+                "x": twist.linear.x,
+                "y": twist.linear.y,
+                "z": twist.linear.z,
             },
-            "linear_acceleration": {
-                "x": msg.linear_acceleration.x,
-                "y": msg.linear_acceleration.y,
-                "z": msg.linear_acceleration.z,
+            "angular": {
+                "x": twist.angular.x,
+                "y": twist.angular.y,
+                "z": twist.angular.z,
             },
-            "header": {
-                "stamp": msg.header.stamp.to_sec(),
-                "frame_id": msg.header.frame_id,
-            }
+        },
+        "header": {
+            "stamp": msg.header.stamp.to_sec(),
+            "frame_id": msg.header.frame_id,
         }
+    }
 
-def joint_states_callback(msg):
-    with data_lock:
-        latest_data["joint_states"] = {
-            "name": list(msg.name),
-            "position": list(msg.position),
-            "velocity": list(msg.velocity),
-            "effort": list(msg.effort),
-            "header": {
-                "stamp": msg.header.stamp.to_sec(),
-                "frame_id": msg.header.frame_id,
-            }
+def _imu_dict(msg):
+    return {
+        "orientation": {
+            "x": msg.orientation.x,
+            "y": msg.orientation.y,
+            "z": msg.orientation.z,
+            "w": msg.orientation.w,
+        },
+        "angular_velocity": {
+            "x": msg.angular_velocity.x,
+            "y": msg.angular_velocity.y,
+            "z": msg.angular_velocity.z,
+        },
+        "linear_acceleration": {
+            "x": msg.linear_acceleration.x,
+            "y": msg.linear_acceleration.y,
+            "z": msg.linear_acceleration.z,
+        },
+        "header": {
+            "stamp": msg.header.stamp.to_sec(),
+            "frame_id": msg.header.frame_id,
+        }
+    }
+
+def _joint_states_dict(msg):
+    return {
+        "name": list(msg.name),
+        "position": _as_seq(msg.position),
+        "velocity": _as_seq(msg.velocity),
+        "effort": _as_seq(msg.effort),
+        "header": {
+            "stamp": msg.header.stamp.to_sec(),
+            "frame_id": msg.header.frame_id,
         }
+    }
 
 def depth_image_callback(msg):
     try:
         cv_img = bridge.imgmsg_to_cv2(msg, desired_encoding="passthrough")
-        # Convert to PNG for browser
-        import cv2
-        import io
-        ret, buf = cv2.imencode('.png', cv_img)
-        if ret:
-            with data_lock:
-                latest_data["depth_image"] = buf.tobytes()
+        # Store the raw ndarray and encode on GET: running deflate on every
+        # frame held the GIL inside the subscriber thread even when no HTTP
+        # client was polling, and a slow client could backpressure ROS.
+        latest_data["depth_image"] = cv_img
     except Exception:
         pass
 
 def point_cloud_callback(msg):
     # Return raw data as bytes; for point cloud, browser will download it
-    with data_lock:
-        latest_data["point_cloud"] = {
-            "data": msg.data,
-            "fields": [f.name for f in msg.fields],
-            "height": msg.height,
-            "width": msg.width,
-            "is_dense": msg.is_dense,
-            "header": {
-                "stamp": msg.header.stamp.to_sec(),
-                "frame_id": msg.header.frame_id,
-            }
-        }
+    latest_data["point_cloud"] = msg
+
+# Publishers are advertised once at startup: a per-request
+# rospy.Publisher() registers with the master over XMLRPC and silently
+# drops the first publishes while subscriber connections negotiate — the
+# old per-handler retry loops only papered over that. Goal/pose topics are
+# latched so a late subscriber still receives the last command.
+_pub_cmd_vel = None
+_pub_goal = None
+_pub_multi_goal = None
+_pub_initialpose = None
+
+# /move only updates these; a background loop streams the twist at 20 Hz
+# until the deadline passes, so the handler returns in <1 ms instead of
+# blocking a worker thread for 250 ms, and a vanished client stops the
+# robot within 0.3 s.
+_cmd_target = None
+_cmd_deadline = 0.0
+CMD_VEL_TIMEOUT_S = 0.3
+
+def _cmd_pub_loop():
+    rate = rospy.Rate(20)
+    while not rospy.is_shutdown():
+        target = _cmd_target
+        if target is not None and time.monotonic() < _cmd_deadline:
+            _pub_cmd_vel.publish(target)
+        rate.sleep()
 
 def ros_subscribers_thread():
+    global _pub_cmd_vel, _pub_goal, _pub_multi_goal, _pub_initialpose
     init_ros()
-    rospy.Subscriber("/leg_odom", Odometry, odom_callback)
-    rospy.Subscriber("/imu/data", Imu, imu_callback)
-    rospy.Subscriber("/joint_states", JointState, joint_states_callback)
-    rospy.Subscriber("/camera/depth/image_raw", Image, depth_image_callback)
-    rospy.Subscriber("/camera/depth/points", PointCloud2, point_cloud_callback)
+    _pub_cmd_vel = rospy.Publisher("/cmd_vel", Twist, queue_size=1)
+    _pub_goal = rospy.Publisher("/move_base_simple/goal", PoseStamped, queue_size=1, latch=True)
+    _pub_multi_goal = rospy.Publisher("/multi_goal", PoseStamped, queue_size=1, latch=True)
+    _pub_initialpose = rospy.Publisher("/initialpose", PoseWithCovarianceStamped, queue_size=1, latch=True)
+    # Let the advertisement handshakes settle before requests arrive.
+    rospy.sleep(0.3)
+    threading.Thread(target=_cmd_pub_loop, daemon=True).start()
+    rospy.Subscriber("/leg_odom", Odometry, odom_callback,
+                     queue_size=1, tcp_nodelay=True)
+    rospy.Subscriber("/imu/data", Imu, imu_callback,
+                     queue_size=1, tcp_nodelay=True)
+    rospy.Subscriber("/joint_states", JointState, joint_states_callback,
+                     queue_size=1, tcp_nodelay=True)
+    # queue_size=1 drops stale frames/clouds instead of queuing them, and a
+    # buff_size larger than one message keeps rospy reading each multi-MB
+    # payload in one recv() instead of dozens of small fragments.
+    rospy.Subscriber("/camera/depth/image_raw", Image, depth_image_callback,
+                     queue_size=1, buff_size=2**24, tcp_nodelay=True)
+    rospy.Subscriber("/camera/depth/points", PointCloud2, point_cloud_callback,
+                     queue_size=1, buff_size=2**24, tcp_nodelay=True)
     rospy.spin()
 
 ros_thread = threading.Thread(target=ros_subscribers_thread, daemon=True)
 ros_thread.start()
 
+# Last serialized /sdata body keyed on the three message refs. Callbacks
+# rebind a fresh object per message, so identity comparison detects
+# change; keeping the refs in the tuple pins them against id reuse.
+_sdata_cache = (None, None, None, b"")
+
 @app.route("/sdata", methods=["GET"])
 def sdata():
-    # Returns latest sensor readings
-    with data_lock:
+    # Returns latest sensor readings; grab the refs once, then build the
+    # JSON view outside any synchronization. Polls that land between ROS
+    # updates reuse the previously encoded bytes.
+    global _sdata_cache
+    odom = latest_data["leg_odom"]
+    imu = latest_data["imu"]
+    joints = latest_data["joint_states"]
+    cached = _sdata_cache
+    if cached[0] is odom and cached[1] is imu and cached[2] is joints:
+        body = cached[3]
+    else:
         result = {
-            "leg_odom": latest_data["leg_odom"],
-            "imu": latest_data["imu"],
-            "joint_states": latest_data["joint_states"]
+            "leg_odom": _odom_dict(odom) if odom is not None else None,
+            "imu": _imu_dict(imu) if imu is not None else None,
+            "joint_states": _joint_states_dict(joints) if joints is not None else None,
         }
-    return jsonify(result)
+        body = dump_json(result)
+        _sdata_cache = (odom, imu, joints, body)
+    return _gzip_json(body)
+
+# Visualization clients don't need 16-bit dynamic range: scaling to uint8
+# over a fixed working range (8 m default) halves the bytes fed to deflate
+# and the PNG that comes out. An optional nearest-neighbour downsample
+# divides bandwidth by the factor squared.
+DEPTH_MAX_MM = float(os.environ.get("DEPTH_MAX_MM", "8000"))
+DEPTH_DOWNSAMPLE = int(os.environ.get("DEPTH_DOWNSAMPLE", "1"))
+
+def quantize_depth(img):
+    if img.dtype != np.uint8:
+        img = np.clip(img * (255.0 / DEPTH_MAX_MM), 0, 255).astype(np.uint8)
+    if DEPTH_DOWNSAMPLE > 1:
+        img = cv2.resize(img, (img.shape[1] // DEPTH_DOWNSAMPLE,
+                               img.shape[0] // DEPTH_DOWNSAMPLE),
+                         interpolation=cv2.INTER_NEAREST)
+    return img
+
+# Ceiling for the push stream; IMU arrives at up to 500 Hz but no dashboard
+# needs more than this.
+SDATA_STREAM_MAX_HZ = float(os.environ.get("SDATA_STREAM_MAX_HZ", "50"))
+
+@app.route("/sdata/stream", methods=["GET"])
+def sdata_stream():
+    # Server-sent events: one long-lived connection instead of a TCP
+    # handshake per poll, with frames pushed the moment new data lands.
+    def gen():
+        min_interval = 1.0 / SDATA_STREAM_MAX_HZ
+        while True:
+            _sdata_event.wait(timeout=1.0)
+            _sdata_event.clear()
+            odom = latest_data["leg_odom"]
+            imu = latest_data["imu"]
+            joints = latest_data["joint_states"]
+            result = {
+                "leg_odom": _odom_dict(odom) if odom is not None else None,
+                "imu": _imu_dict(imu) if imu is not None else None,
+                "joint_states": _joint_states_dict(joints) if joints is not None else None,
+            }
+            yield b"data: " + dump_json(result) + b"\n\n"
+            time.sleep(min_interval)
+    return Response(gen(), mimetype="text/event-stream")
 
 @app.route("/sdata/depth_image", methods=["GET"])
 def depth_image():
-    with data_lock:
-        img_bytes = latest_data.get("depth_image")
-        if img_bytes:
-            return Response(img_bytes, mimetype="image/png")
-        else:
-            return Response("No image", status=404)
+    img = latest_data.get("depth_image")
+    if img is None:
+        return Response("No image", status=404)
+    png = encode_depth_png(quantize_depth(img))
+    if png is None:
+        return Response("Encode failed", status=500)
+    return Response(png, mimetype="image/png")
+
+@app.route("/sdata/depth_image_raw.npy", methods=["GET"])
+def depth_image_raw_npy():
+    # Full-fidelity counterpart of the quantized PNG above.
+    img = latest_data.get("depth_image")
+    if img is None:
+        return Response("No image", status=404)
+    buf = io.BytesIO()
+    np.lib.format.write_array(buf, img, allow_pickle=False)
+    return Response(buf.getvalue(), mimetype="application/octet-stream",
+                    headers={"Content-Disposition": "attachment; filename=depth_image.npy"})
+
+@app.route("/sdata/depth_image.pgm", methods=["GET"])
+def depth_image_pgm():
+    # Raw binary graymap: just a header plus the frame bytes, no deflate at
+    # all, for latency-sensitive clients that can read PGM.
+    img = latest_data.get("depth_image")
+    if img is None:
+        return Response("No image", status=404)
+    maxval = 65535 if img.dtype == np.uint16 else 255
+    hdr = b"P5\n%d %d\n%d\n" % (img.shape[1], img.shape[0], maxval)
+    return Response(hdr + img.tobytes(), mimetype="image/x-portable-graymap")
+
+# The field layout is fixed per topic, so the joined name list is cached
+# on (point_step, field count) instead of being rebuilt per request.
+_pc_fields_cache = {}
+
+def pc_field_names(msg):
+    key = (msg.point_step, len(msg.fields))
+    names = _pc_fields_cache.get(key)
+    if names is None:
+        names = ",".join(f.name for f in msg.fields)
+        _pc_fields_cache[key] = names
+    return names
+
+# sensor_msgs/PointField datatype codes -> numpy formats.
+_PF_NUMPY = {1: 'i1', 2: 'u1', 3: 'i2', 4: 'u2', 5: 'i4', 6: 'u4', 7: 'f4', 8: 'f8'}
+_pc_dtype_cache = {}
+
+def pc_dtype(msg):
+    # A structured dtype makes np.frombuffer a zero-copy view over the
+    # whole cloud; field extraction then vectorizes instead of looping
+    # per point. Built once per field layout.
+    key = (tuple(f.name for f in msg.fields),
+           tuple(f.offset for f in msg.fields),
+           tuple(f.datatype for f in msg.fields),
+           msg.point_step)
+    dt = _pc_dtype_cache.get(key)
+    if dt is None:
+        dt = np.dtype({'names': [f.name for f in msg.fields],
+                       'formats': [_PF_NUMPY[f.datatype] for f in msg.fields],
+                       'offsets': [f.offset for f in msg.fields],
+                       'itemsize': msg.point_step})
+        _pc_dtype_cache[key] = dt
+    return dt
+
+@app.route("/sdata/point_cloud.npy", methods=["GET"])
+def point_cloud_npy():
+    # Parsed view for consumers that want XYZ fields without re-deriving
+    # the wire layout client-side.
+    pc = latest_data.get("point_cloud")
+    if pc is None:
+        return Response("No point cloud", status=404)
+    arr = np.frombuffer(pc.data, dtype=pc_dtype(pc)).reshape(pc.height, pc.width)
+    buf = io.BytesIO()
+    np.lib.format.write_array(buf, arr, allow_pickle=False)
+    return Response(buf.getvalue(), mimetype="application/octet-stream",
+                    headers={"Content-Disposition": "attachment; filename=point_cloud.npy"})
 
 @app.route("/sdata/point_cloud", methods=["GET"])
 def point_cloud():
-    with data_lock:
-        pc = latest_data.get("point_cloud")
-        if pc:
-            return Response(pc["data"], mimetype="application/octet-stream",
-                            headers={
-                                "Content-Disposition": "attachment; filename=point_cloud.bin"
-                            })
-        else:
-            return Response("No point cloud", status=404)
+    pc = latest_data.get("point_cloud")
+    if pc is None:
+        return Response("No point cloud", status=404)
+    data = pc.data
+    # direct_passthrough hands the buffer straight to the WSGI server; a
+    # memoryview avoids re-copying the multi-MB cloud into the response.
+    return Response(iter((memoryview(data),)), direct_passthrough=True,
+                    mimetype="application/octet-stream",
+                    headers={
+                        "Content-Length": str(len(data)),
+                        "Content-Disposition": "attachment; filename=point_cloud.bin",
+                        "X-Point-Fields": pc_field_names(pc),
+                    })
+
+@app.route("/sdata/point_cloud.ros", methods=["GET"])
+def point_cloud_ros():
+    # Raw ROS wire bytes, zero transcoding: ROS clients rebuild the message
+    # with PointCloud2().deserialize(body). rospy keeps the received buffer
+    # on some message paths (_buff); otherwise serialize once here.
+    pc = latest_data.get("point_cloud")
+    if pc is None:
+        return Response("No point cloud", status=404)
+    raw = getattr(pc, "_buff", None)
+    if raw is None:
+        buf = io.BytesIO()
+        pc.serialize(buf)
+        raw = buf.getvalue()
+    return Response(raw, mimetype="application/octet-stream",
+                    headers={"Content-Disposition": "attachment; filename=point_cloud.ros"})
 
 @app.route("/move", methods=["POST"])
 def move():
+    global _cmd_target, _cmd_deadline
     data = request.json
     if not data:
-        return jsonify({"error": "Missing request body"}), 400
+        return _json({"error": "Missing request body"}, status=400)
 
     linear = data.get("linear", {})
     angular = data.get("angular", {})
     try:
-        init_ros()
-        pub = rospy.Publisher("/cmd_vel", Twist, queue_size=1)
+        if _pub_cmd_vel is None:
+            return _json({"error": "ROS not ready"}, status=503)
         twist = Twist()
         twist.linear.x = float(linear.get("x", 0))
         twist.linear.y = float(linear.get("y", 0))
@@ -202,95 +473,85 @@ def move():
         twist.angular.x = float(angular.get("x", 0))
         twist.angular.y = float(angular.get("y", 0))
         twist.angular.z = float(angular.get("z", 0))
-        # Publish command for a short duration
-        for _ in range(5):
-            pub.publish(twist)
-            rospy.sleep(0.05)
-        return jsonify({"status": "OK"})
+        _cmd_target = twist
+        _cmd_deadline = time.monotonic() + CMD_VEL_TIMEOUT_S
+        return _json({"status": "OK"})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _json({"error": str(e)}, status=500)
 
 @app.route("/goal", methods=["POST"])
 def goal():
     data = request.json
     if not data:
-        return jsonify({"error": "Missing request body"}), 400
+        return _json({"error": "Missing request body"}, status=400)
 
     x = data.get("x")
     y = data.get("y")
     theta = data.get("theta", 0)
     is_multi_goal = bool(data.get("multi_goal", False))
     try:
-        init_ros()
-        if is_multi_goal:
-            # For multi-goal, assume a topic or action (example: /multi_goal)
-            pub = rospy.Publisher("/multi_goal", PoseStamped, queue_size=1)
-            pose = PoseStamped()
-            pose.header = Header(stamp=rospy.Time.now(), frame_id="map")
-            pose.pose.position.x = float(x)
-            pose.pose.position.y = float(y)
-            pose.pose.position.z = 0
-            import tf
-            quat = tf.transformations.quaternion_from_euler(0, 0, float(theta))
-            pose.pose.orientation.x = quat[0]
-            pose.pose.orientation.y = quat[1]
-            pose.pose.orientation.z = quat[2]
-            pose.pose.orientation.w = quat[3]
-            pub.publish(pose)
-        else:
-            pub = rospy.Publisher("/move_base_simple/goal", PoseStamped, queue_size=1)
-            pose = PoseStamped()
-            pose.header = Header(stamp=rospy.Time.now(), frame_id="map")
-            pose.pose.position.x = float(x)
-            pose.pose.position.y = float(y)
-            pose.pose.position.z = 0
-            import tf
-            quat = tf.transformations.quaternion_from_euler(0, 0, float(theta))
-            pose.pose.orientation.x = quat[0]
-            pose.pose.orientation.y = quat[1]
-            pose.pose.orientation.z = quat[2]
-            pose.pose.orientation.w = quat[3]
-            pub.publish(pose)
-        return jsonify({"status": "OK"})
+        # For multi-goal, assume a topic or action (example: /multi_goal)
+        pub = _pub_multi_goal if is_multi_goal else _pub_goal
+        if pub is None:
+            return _json({"error": "ROS not ready"}, status=503)
+        pose = PoseStamped()
+        pose.header = Header(stamp=rospy.Time.now(), frame_id="map")
+        pose.pose.position.x = float(x)
+        pose.pose.position.y = float(y)
+        pose.pose.position.z = 0
+        quat = _yaw_quat(float(theta))
+        pose.pose.orientation.x = quat[0]
+        pose.pose.orientation.y = quat[1]
+        pose.pose.orientation.z = quat[2]
+        pose.pose.orientation.w = quat[3]
+        pub.publish(pose)
+        return _json({"status": "OK"})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _json({"error": str(e)}, status=500)
+
+# Fixed default covariance for /initialpose; built once instead of
+# allocating 36 boxed floats per request.
+_DEFAULT_COV = (0.25, 0, 0, 0, 0, 0,
+                0, 0.25, 0, 0, 0, 0,
+                0, 0, 0.25, 0, 0, 0,
+                0, 0, 0, 0.06853891945200942, 0, 0,
+                0, 0, 0, 0, 0.06853891945200942, 0,
+                0, 0, 0, 0, 0, 0.06853891945200942)
 
 @app.route("/pose", methods=["POST"])
 def pose():
     data = request.json
     if not data:
-        return jsonify({"error": "Missing request body"}), 400
+        return _json({"error": "Missing request body"}, status=400)
 
     x = data.get("x")
     y = data.get("y")
     theta = data.get("theta", 0)
     try:
-        init_ros()
-        pub = rospy.Publisher("/initialpose", PoseWithCovarianceStamped, queue_size=1)
+        if _pub_initialpose is None:
+            return _json({"error": "ROS not ready"}, status=503)
         pose = PoseWithCovarianceStamped()
         pose.header = Header(stamp=rospy.Time.now(), frame_id="map")
         pose.pose.pose.position.x = float(x)
         pose.pose.pose.position.y = float(y)
         pose.pose.pose.position.z = 0
-        import tf
-        quat = tf.transformations.quaternion_from_euler(0, 0, float(theta))
+        quat = _yaw_quat(float(theta))
         pose.pose.pose.orientation.x = quat[0]
         pose.pose.pose.orientation.y = quat[1]
         pose.pose.pose.orientation.z = quat[2]
         pose.pose.pose.orientation.w = quat[3]
         # Set covariance to a default
-        pose.pose.covariance = [0.25, 0, 0, 0, 0, 0,
-                                0, 0.25, 0, 0, 0, 0,
-                                0, 0, 0.25, 0, 0, 0,
-                                0, 0, 0, 0.06853891945200942, 0, 0,
-                                0, 0, 0, 0, 0.06853891945200942, 0,
-                                0, 0, 0, 0, 0, 0.06853891945200942]
-        for _ in range(3):
-            pub.publish(pose)
-            rospy.sleep(0.05)
-        return jsonify({"status": "OK"})
+        pose.pose.covariance = _DEFAULT_COV
+        _pub_initialpose.publish(pose)
+        return _json({"status": "OK"})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _json({"error": str(e)}, status=500)
 
 if __name__ == "__main__":
-    app.run(host=HTTP_SERVER_HOST, port=HTTP_SERVER_PORT)
\ No newline at end of file
+    # waitress is a real threaded WSGI server with keep-alive; Flask's dev
+    # server stays as the fallback for bare environments.
+    try:
+        from waitress import serve
+        serve(app, host=HTTP_SERVER_HOST, port=HTTP_SERVER_PORT, threads=16)
+    except ImportError:
+        app.run(host=HTTP_SERVER_HOST, port=HTTP_SERVER_PORT)
\ No newline at end of file